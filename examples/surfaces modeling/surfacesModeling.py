@@ -90,7 +90,7 @@ aSurface.applyDefaultOrientation()
 aSurface.plotTriangulatedArea('original')
 
 #= save the constructed surface object for later quick loading
-pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'.pkl','wb'), protocol=2)
+pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
 
 #%%
 '''
@@ -127,7 +127,7 @@ aSurface.cropPointCloudAndReTriangulate(**kwargs)
 aSurface.plotTriangulatedArea('retriangulated')
 
 #= save the rotated surface object for later quick loading for cropping
-pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'_retriangulated'+'.pkl','wb'), protocol=2)
+pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'_retriangulated'+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
 
 #%%
 '''
@@ -161,7 +161,7 @@ aSurface.rotateSurfaceFeatures(rotationAngle)
 aSurface.plotTriangulatedArea('rotated')
 
 #= save the rotated surface object for later quick loading for cropping
-pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'_rotated'+'.pkl','wb'), protocol=2)
+pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'_rotated'+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
 
 #%%
 '''
@@ -192,4 +192,4 @@ aSurface.cropTriangulatedArea(ax1_limits, ax2_limits)
 aSurface.plotTriangulatedArea('cropped')
     
 #= save the cropped surface object for later quick loading into the code
-pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'_cropped'+'.pkl','wb'), protocol=2)
\ No newline at end of file
+pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'_cropped'+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
\ No newline at end of file
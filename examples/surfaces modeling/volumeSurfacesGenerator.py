@@ -181,5 +181,5 @@ for surfaceOrientation, settings in surfaceTrimeshSettings.items():
     aSurface.plotTriangulatedArea('')
         
     #= save the cropped surface object for later quick loading into the code
-    pickle.dump(aSurface, open(surfaceOrientation+'_'+settings['finish']+'.pkl','wb'), protocol=2)
+    pickle.dump(aSurface, open(surfaceOrientation+'_'+settings['finish']+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
     
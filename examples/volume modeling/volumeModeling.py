@@ -82,4 +82,4 @@ surfaceTrimeshes = {'+x': {'dm': pointCloudFileName},
 aVolume.addSurfaceTrimeshes(surfaceTrimeshes=surfaceTrimeshes, alreadyCreated = False)
 
 #= save the created volume
-pickle.dump(aVolume, open(name+'_volume.pkl','wb'), protocol=2)
+pickle.dump(aVolume, open(name+'_volume.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
@@ -8,8 +8,11 @@
 '''
 
 
-from IPython import get_ipython
-get_ipython().run_line_magic('reset', '-f')
+#= only reset the namespace of an interactive IPython session, i.e. plain python runs don't need IPython installed
+import sys
+if 'IPython' in sys.modules:
+    from IPython import get_ipython
+    if get_ipython() is not None: get_ipython().run_line_magic('reset', '-f')
 #get_ipython().run_line_magic('clear', '')
 #get_ipython().run_line_magic('matplotlib', 'inline')
 
@@ -20,6 +23,7 @@ sys.path.append('src')
 
 import materials
 import geometry
+import volume
 import source
 import tracker
 
@@ -118,8 +122,8 @@ else:
     if reflector == 'wrapped':
         # == reflector
         reflector_material    = materialsLibrary['Teflon']
-        reflector_width       = pillar_width + 2*np.ceil(np.max([Geo.volumes['pillar'].surfaceTrimeshes[(1, 0, 0)].trimesh.bounds[1, 0], 
-                                                                 Geo.volumes['pillar'].surfaceTrimeshes[(0, 1, 0)].trimesh.bounds[1, 1]
+        reflector_width       = pillar_width + 2*np.ceil(np.max([Geo.volumes['pillar'].surfaceTrimeshes[volume.NORMAL_KEYS['+x']].trimesh.bounds[1, 0], 
+                                                                 Geo.volumes['pillar'].surfaceTrimeshes[volume.NORMAL_KEYS['+y']].trimesh.bounds[1, 1]
                                                                  ])*1E3)*1E-6    # mm
         reflector_length      = pillarLength+2*optGel_length      # mm
         reflector_center      = np.array([0.0, 0.0, 0.0])
@@ -138,7 +142,7 @@ else:
     volumeList = Geo.volumes
     
     #= save the created geometry
-    pickle.dump(volumeList, open(f"data/geometries/{geometryFileName}.pkl",'wb'), protocol=2) 
+    pickle.dump(volumeList, open(f"data/geometries/{geometryFileName}.pkl",'wb'), protocol=pickle.HIGHEST_PROTOCOL) 
 
 
 
@@ -168,7 +172,7 @@ pillar_material               = materialsLibrary['EJ-204']
 numberOfOpticalPhotons        = 50
 opticalPhotonEmissionPosition = np.array([0.0, 0.0, emissionZPosition])        # mm
 sourcePhotons = source.isotropicOpticalPhotonSourceInfo(pillar_material, numberOfOpticalPhotons, opticalPhotonEmissionPosition)
-pickle.dump(sourcePhotons, open('output/'+reflector+'_'+surfaceFinish+'_sourcePhotons'+'_pos_'+str(int(emissionZPosition))+'mm.pkl','wb'), protocol=2)
+pickle.dump(sourcePhotons, open('output/'+reflector+'_'+surfaceFinish+'_sourcePhotons'+'_pos_'+str(int(emissionZPosition))+'mm.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
 # == or load source photons file
 # sourcePhotons = pickle.load(open('output/'+reflector+'_'+surfaceFinish+'_sourcePhotons'+'_pos_'+str(int(emissionZPosition))+'mm.pkl', 'rb'))
 
@@ -221,12 +225,11 @@ print('-----------')
 #= open an h5 file and initilize and empty trackingHistory dataset   
 with h5py.File('output/'+reflector+'_'+surfaceFinish+'_trackingHistory'+'_pos_'+str(int(emissionZPosition))+'mm.hdf5', 'w') as outputFile:
 
-    # == loop for the isotropic point source optical photons
-    for p, oPhoton in enumerate(sourcePhotons):
-        if p%100 == 0.0: print(str.format('working event: {} ({:2.2f}% complete)', p, float(p)/len(sourcePhotons)*100))
-        
-        #= track the current photon and return its tracking history
-        opTrackingHistory = tracker.trackPhoton(p, oPhoton, volumeList)
+    # == loop for the isotropic point source optical photons tracked in batches of 100 (arbitrary) photons distributed
+    #    over all available CPU cores; the tracking histories are returned in the order of the source photons
+    for p, opTrackingHistory in enumerate(tracker.trackPhotonsParallel(sourcePhotons, volumeList, batchSize = 100)):
+        if p % 100 == 0:
+            print(str.format('working event: {} ({:2.2f}% complete)', p, float(p)/len(sourcePhotons)*100))
         
         if p == 0:
             #= create the dataset for the first time
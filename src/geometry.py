@@ -18,7 +18,9 @@ import volume
 
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
@@ -92,7 +94,7 @@ class geometry:
 
         '''
         
-        pickle.dump(self.volumes, open(geometryFileName+'.pkl','wb'), protocol=2)
+        pickle.dump(self.volumes, open(geometryFileName+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
 
         return
     
@@ -370,9 +372,9 @@ class geometry:
                         closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
                         if len(closestIntersectIndex) > 1:
                             raise ValueError(f"Eliminating the reflector volume intersection has failed during identifying the next touhcing volume of {currentVol.name}...\n")
-                    touchingVolumes[tuple(direction)] = volumeIntersects['volume'][closestIntersectIndex][0]
+                    touchingVolumes[volume.encodeNormal(direction)] = volumeIntersects['volume'][closestIntersectIndex][0]
                 else:
-                    touchingVolumes[tuple(direction)] = 'environment'
+                    touchingVolumes[volume.encodeNormal(direction)] = 'environment'
             
             #= record all the touching volumes of the current volume
             currentVol.touchingVolumes = touchingVolumes
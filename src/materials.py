@@ -17,7 +17,9 @@ from scipy import interpolate
 
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
@@ -108,7 +110,7 @@ class materials:
                                  +'Did you forget to first build the materialsLibrary?')
         
         # = save the materialsLibrary for later quick loading
-        pickle.dump(self.materialsLibrary, open(materialsLibraryFileName+'.pkl','wb'), protocol=2)
+        pickle.dump(self.materialsLibrary, open(materialsLibraryFileName+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
         
         return
     
@@ -130,6 +132,9 @@ class materials:
         '''
         
         self.materialsLibrary = pickle.load(open(materialsLibraryFileName+'.pkl', 'rb'))
+        #= add the reflector lookups to reflector materials saved with an older version of the library
+        for data in self.materialsLibrary.values():
+            self.addReflectorLookups(data)
         
         return
     
@@ -523,7 +528,45 @@ class materials:
         specularLobeSigma[1, :]    = interpolation_func(inAngles)
         data['specularLobeSigma']  = specularLobeSigma
         
+        materials.addReflectorLookups(data)
+        
         return data
+    
+    
+    
+    @staticmethod
+    def addReflectorLookups(data):
+        '''
+        adding lookups of the reflector properties sampled at every reflector interaction, i.e.
+            - 'specularLobeSigmaLookup': list of the specular lobe sigma indexed by the integer incidence angle in degrees.
+            - 'doubleExpFitCoefficients': tuple (a1, b1, a2, b2) of the lambertian fraction fit parameters.
+        
+        Note: materials without a specular lobe sigma (i.e. not reflectors) or that already have the lookups are
+              left unchanged.
+
+        Parameters
+        ----------
+        data : dict
+               Material properties.
+
+        Returns
+        -------
+        None.
+
+        '''
+        
+        if 'specularLobeSigma' not in data or 'specularLobeSigmaLookup' in data:
+            return
+        
+        specularLobeSigma = data['specularLobeSigma']
+        lookup            = np.zeros(91)
+        lookup[specularLobeSigma[0, :].astype(int)] = specularLobeSigma[1, :]
+        data['specularLobeSigmaLookup'] = lookup.tolist()
+        
+        fitParams = data['lambertianFraction']['doubleExpFitParams']
+        data['lambertianFraction']['doubleExpFitCoefficients'] = (fitParams['a1'], fitParams['b1'], fitParams['a2'], fitParams['b2'])
+        
+        return
         
     
     
@@ -10,9 +10,25 @@
 
 import sys
 
+import numpy as np
+
+
+#= compact photon table record used to store batches of sampled optical photons contiguously in memory
+PHOTON_DTYPE = np.dtype([('position',         np.float64, (3,)),     # um
+                         ('momentumDir',      np.float64, (3,)),
+                         ('polarizationDir',  np.float64, (3,)),
+                         ('wavelength',       np.float64),           # nm
+                         ('time',             np.float64),           # ns
+                         ('traveledDistance', np.float64),           # um
+                         ('weight',           np.float64),
+                         ('alive',            np.bool_),
+                         ])
+
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
@@ -22,6 +38,11 @@ def resetIPython():
 
 class opticalPhoton:
     
+    #  Note: the attributes are stored in fixed slots instead of a per-photon __dict__, which makes their lookups
+    #        and updates at every tracking step faster and the photon objects smaller.
+    __slots__ = ('position', 'wavelength', 'momentumDir', 'polarizationDir', 'time', 'traveledDistance', 'weight',
+                 'volume', 'alive', 'historyLength')
+    
     def __init__(self, position, wavelength, momentumDirection, polarizationDirection,
                  time = 0.0, traveledDistance = 0.0, weight = 1.0,
                  volume = 'pillar', alive = True,
@@ -71,6 +92,20 @@ class opticalPhoton:
         self.weight           = weight
         self.volume           = volume
         self.alive            = alive
+        self.historyLength    = 0        # number of recorded steps in the photon's tracking history buffer
+        
+        
+        
+    def __setstate__(self, state):
+        '''
+        restore a pickled optical photon, including photons pickled with an older version of the class that stored
+        their attributes in a __dict__ and had no historyLength
+        '''
+        
+        if isinstance(state, tuple): state = {**(state[0] or {}), **state[1]}
+        self.historyLength = 0
+        for name, value in state.items():
+            setattr(self, name, value)
     
     
 #%% main
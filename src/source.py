@@ -9,6 +9,7 @@
 
 
 import sys
+import os
 
 import numpy as np
 import pandas as pd
@@ -17,7 +18,9 @@ import opticalPhoton
 
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
@@ -52,6 +55,39 @@ def generateRandomUnitVector(numberOfVectors):
 
 
 
+def photonTableToList(photons):
+    '''
+    a method to wrap the rows of a photon table into opticalPhoton objects
+    Note: the (1x3) position, momentum and polarization arrays of each opticalPhoton object are views into the table
+          rows, i.e. no per-photon copies of the sampled information are made.
+
+    Parameters
+    ----------
+    photons : (n,) structured array of opticalPhoton.PHOTON_DTYPE
+              Photon table with the sampled emission information.
+
+    Returns
+    -------
+    OPlist : list
+             OpticalPhoton objects with the sampled emission information.
+
+    '''
+    
+    OPlist = [None]*len(photons)
+    for opNumber in range(len(photons)):
+        OPlist[opNumber] = opticalPhoton.opticalPhoton(photons['position'][opNumber:opNumber+1],
+                                                       photons['wavelength'][opNumber],
+                                                       photons['momentumDir'][opNumber:opNumber+1],
+                                                       photons['polarizationDir'][opNumber:opNumber+1],
+                                                       photons['time'][opNumber],
+                                                       traveledDistance = photons['traveledDistance'][opNumber],
+                                                       weight = photons['weight'][opNumber],
+                                                       alive = bool(photons['alive'][opNumber]))
+    
+    return OPlist
+
+
+
 def generateOpticalPhotonsInfo(position, energy, scintMaterial):
     '''
     a method to sample optical photons emission information using the scintillator material and deposited energy
@@ -81,31 +117,26 @@ def generateOpticalPhotonsInfo(position, energy, scintMaterial):
     scintEmissionTimes        = scintMaterial['timeResponse']['time']             # ns
     scintEmissionTimeResponse = scintMaterial['timeResponse']['amplitude']        # a.u.
     
-    # == random-sample the optical photon emission information
-    opCount           = int(np.random.normal(energy*scintLY, np.sqrt(energy*scintLY)))
+    # == random-sample the optical photon emission information into a photon table
+    opCount                     = int(np.random.normal(energy*scintLY, np.sqrt(energy*scintLY)))
+    photons                     = np.zeros(opCount, dtype=opticalPhoton.PHOTON_DTYPE)
     #
-    opWavelegnths     = np.random.choice(scintEmissionWavelengths, size=opCount,
-                                         p=scintEmissionSpectrum)                          # nm
+    photons['wavelength']       = np.random.choice(scintEmissionWavelengths, size=opCount,
+                                                   p=scintEmissionSpectrum)                # nm
     #
-    position         *= 1E3                                                                # um
-    opPositions       = [(position[0], position[1], position[2]),]*opCount
-    opPositions       = np.asarray(opPositions)
+    photons['position']         = np.asarray(position, dtype=np.float64)*1E3               # um
     #
-    opMomentumDir     = generateRandomUnitVector(opCount)
+    photons['momentumDir']      = generateRandomUnitVector(opCount)
     #
-    opPolarizationDir = generateRandomUnitVector(opCount)
+    photons['polarizationDir']  = generateRandomUnitVector(opCount)
     #
-    opTimes           = np.random.choice(scintEmissionTimes, size=opCount,
-                                         p=scintEmissionTimeResponse)                      # ns
+    photons['time']             = np.random.choice(scintEmissionTimes, size=opCount,
+                                                   p=scintEmissionTimeResponse)            # ns
+    photons['weight']           = 1.0
+    photons['alive']            = True
     
     # == store the sampled info into a list of opticalPhoton objects
-    OPlist = []
-    for opNumber in range(opCount):
-        OPlist.append(opticalPhoton.opticalPhoton(np.array([opPositions[opNumber]]),
-                                                  opWavelegnths[opNumber],
-                                                  np.array([opMomentumDir[opNumber]]),
-                                                  np.array([opPolarizationDir[opNumber]]),
-                                                  opTimes[opNumber]))
+    OPlist = photonTableToList(photons)
     
     return OPlist
 
@@ -148,16 +179,22 @@ def energyDepositions(energyDepositionsFileName, scintMaterial, generatePhotonsI
     print('Loading an energy depositions dataframe...')
     
     # == load the energy depositons dataframe and checking if it has all the necessary information
+    #  Note: for large energy depositions files, the positions could be stored in a sibling (nx3) '.npy' file
+    #        ('<energyDepositionsFileName>_positions.npy') which is memory-mapped so that only the positions of the
+    #        visited events are read from disk.
     energyDepositions = pd.read_hdf(energyDepositionsFileName+'.hdf')
-    if 'energy' and 'position' not in energyDepositions.columns:
+    positionsFileName = energyDepositionsFileName+'_positions.npy'
+    positions         = np.load(positionsFileName, mmap_mode='r') if os.path.isfile(positionsFileName) else None      # mm
+    if 'energy' not in energyDepositions.columns or ('position' not in energyDepositions.columns and positions is None):
         raise AttributeError("The loaded energy depositions dataframe does not contain all necessary information...\n"
-                            + "Please make sure the dataframe has 'energy' & 'position' columns.")
+                            + "Please make sure the dataframe has 'energy' & 'position' columns or a '_positions.npy' file is provided.")
     
     # == generate optical photon emission information for each primary event of energy deposition
     if generatePhotonsInfo:
         sourceData = {}
         for event, energy in enumerate(energyDepositions['energy']):
-            event_OPlist = generateOpticalPhotonsInfo(energyDepositions['position'].iloc[event], energy, scintMaterial)
+            position          = positions[event] if positions is not None else energyDepositions['position'].iloc[event]
+            event_OPlist      = generateOpticalPhotonsInfo(position, energy, scintMaterial)
             sourceData[event] = event_OPlist
         return sourceData
     else:
@@ -271,15 +308,14 @@ def opticalPhotonsInfo(opticalPhotonsInformationFileName, generatePhotonsInfo =
     
     # == store the optical photon emission information into opticalPhoton objects
     if generatePhotonsInfo:
-        sourceData = []
+        sourceData = [None]*len(opticalPhotonInformation)
         for opNumber in range(len(opticalPhotonInformation)):
-            sourceData.append(opticalPhoton.opticalPhoton(np.array([opticalPhotonInformation['position'].iloc[opNumber]]*1E3),
-                                                          opticalPhotonInformation['wavelength'].iloc[opNumber],
-                                                          np.array([opticalPhotonInformation['momentumDirection'].iloc[opNumber]]),
-                                                          np.array([opticalPhotonInformation['polarizationDirection'].iloc[opNumber]]),
-                                                          time = opticalPhotonInformation['time'].iloc[opNumber],
-                                                          )
-                              )
+            sourceData[opNumber] = opticalPhoton.opticalPhoton(np.array([opticalPhotonInformation['position'].iloc[opNumber]]*1E3),
+                                                               opticalPhotonInformation['wavelength'].iloc[opNumber],
+                                                               np.array([opticalPhotonInformation['momentumDirection'].iloc[opNumber]]),
+                                                               np.array([opticalPhotonInformation['polarizationDirection'].iloc[opNumber]]),
+                                                               time = opticalPhotonInformation['time'].iloc[opNumber],
+                                                               )
         return sourceData
     else:
         return opticalPhotonInformation
@@ -316,29 +352,25 @@ def isotropicOpticalPhotonSourceInfo(scintMaterial, numberOfOpticalPhotons, opEm
     scintEmissionTimes        = scintMaterial['timeResponse']['time']             # ns
     scintEmissionTimeResponse = scintMaterial['timeResponse']['amplitude']        # a.u.
     
-    # == random-sample the optical photon emission information
-    opWavelegnths       = np.random.choice(scintEmissionWavelengths, size=numberOfOpticalPhotons,
-                                         p=scintEmissionSpectrum)                 # nm
+    # == random-sample the optical photon emission information into a photon table
+    photons                     = np.zeros(numberOfOpticalPhotons, dtype=opticalPhoton.PHOTON_DTYPE)
+    #
+    photons['wavelength']       = np.random.choice(scintEmissionWavelengths, size=numberOfOpticalPhotons,
+                                                   p=scintEmissionSpectrum)                # nm
     #
-    opEmissionPosition *= 1E3                                                     # um
-    opPositions         = [(opEmissionPosition[0], opEmissionPosition[1], opEmissionPosition[2]),]*numberOfOpticalPhotons
-    opPositions         = np.asarray(opPositions)
+    photons['position']         = np.asarray(opEmissionPosition, dtype=np.float64)*1E3     # um
     #
-    opMomentumDir       = generateRandomUnitVector(numberOfOpticalPhotons)
+    photons['momentumDir']      = generateRandomUnitVector(numberOfOpticalPhotons)
     #
-    opPolarizationDir   = generateRandomUnitVector(numberOfOpticalPhotons)
+    photons['polarizationDir']  = generateRandomUnitVector(numberOfOpticalPhotons)
     #
-    opTimes             = np.random.choice(scintEmissionTimes, size=numberOfOpticalPhotons,
-                                         p=scintEmissionTimeResponse)             # ns
+    photons['time']             = np.random.choice(scintEmissionTimes, size=numberOfOpticalPhotons,
+                                                   p=scintEmissionTimeResponse)            # ns
+    photons['weight']           = 1.0
+    photons['alive']            = True
     
     # == store the sampled info into a list of opticalPhoton objects
-    sourceData = []
-    for opNumber in range(numberOfOpticalPhotons):
-        sourceData.append(opticalPhoton.opticalPhoton(np.array([opPositions[opNumber]]),
-                                                      opWavelegnths[opNumber],
-                                                      np.array([opMomentumDir[opNumber]]),
-                                                      np.array([opPolarizationDir[opNumber]]),
-                                                      opTimes[opNumber]))
+    sourceData = photonTableToList(photons)
     
     return sourceData
     
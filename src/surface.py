@@ -9,35 +9,51 @@
 
 
 import sys
+import os
+import hashlib
+import struct
+import tempfile
+import multiprocessing
 
 import numpy as np
 import pandas as pd
 import pickle
+from scipy.spatial import cKDTree
 
 import trimesh
 import open3d
 
-import seaborn as sns
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
 
+#= set the plotting style once at import (the seaborn darkgrid style is named 'seaborn-v0_8-darkgrid' in matplotlib >= 3.6)
+plt.style.use('seaborn-v0_8-darkgrid' if 'seaborn-v0_8-darkgrid' in plt.style.available else 'seaborn-darkgrid')
+
+#= rotation (axis, angle in degrees) that orients a triangulated area (created facing +z) to each designated normal orientation
+defaultOrientationRotations = {( 1.0,  0.0,  0.0): ('y',  90),
+                               (-1.0,  0.0,  0.0): ('y', -90),
+                               ( 0.0,  1.0,  0.0): ('x', -90),
+                               ( 0.0, -1.0,  0.0): ('x',  90),
+                               ( 0.0,  0.0,  1.0): None,
+                               ( 0.0,  0.0, -1.0): ('x', 180)
+                               }
+
+#= tag of the triangulation method hashed into the cached mesh keys along with the point cloud and parameters
+#  Note: it must be changed whenever the triangulation or the point cloud normals estimation changes; otherwise,
+#        meshes cached by the previous method would be loaded.
+TRIANGULATION_CACHE_TAG = b'poisson-pcaNormals-v1'
+
 
-def seabornInitiation():
-    x = np.arange(0, 10)
-    y = np.arange(0, 10)
-    plt.figure()
-    plt.plot(x, y)
-    sns.set(context='notebook', style='darkgrid', palette='deep', font='sans-serif', font_scale=1, color_codes=True, rc=None)
-    return
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
-    seabornInitiation()
     return
 
 
@@ -84,8 +100,88 @@ class surface:
                              +'Please choose from:'+' '.join(surfaceNormalsDict.keys()))
         self.normalOrientation = surfaceNormalsDict[normalOrientation]
         
+        # == store the normal axis, orientation sign and lateral coordinates indices of the designated orientation
+        self.setOrientationIndices()
+        
+        
+        
+    def __getstate__(self):
+        '''
+        store the surface trimesh as its plain vertices, faces and normal vectors arrays when pickling, i.e. without
+        Trimesh's caches and ray intersection acceleration structures, to keep the pickle small and fast to load
+        '''
+        
+        state = self.__dict__.copy()
+        if 'trimesh' in state:
+            surfaceTrimesh         = state.pop('trimesh')
+            state['trimeshArrays'] = {'vertices'      : surfaceTrimesh.vertices.view(np.ndarray),
+                                      'faces'         : surfaceTrimesh.faces.view(np.ndarray),
+                                      'vertex_normals': np.asarray(surfaceTrimesh.vertex_normals)}
         
+        return state
         
+        
+        
+    def __setstate__(self, state):
+        '''
+        restore a pickled surface, rebuilding its trimesh from the stored arrays, and update surfaces pickled with
+        an older version of the class, i.e. add the orientation indices and the triangles' normal vectors and
+        convert a point cloud dataframe to an (nx3) float32 array
+        '''
+        
+        state         = dict(state)
+        trimeshArrays = state.pop('trimeshArrays', None)
+        self.__dict__.update(state)
+        if trimeshArrays is not None:
+            self.trimesh = trimesh.Trimesh(vertices=trimeshArrays['vertices'], faces=trimeshArrays['faces'],
+                                           face_normals=state.get('faceNormals'), vertex_normals=trimeshArrays['vertex_normals'],
+                                           process=False, validate=False)
+        if not hasattr(self, 'lateralCoordIndices'): self.setOrientationIndices()
+        if not hasattr(self, 'faceNormals') and hasattr(self, 'trimesh'): self.faceNormals = self.trimesh.face_normals.copy()
+        if isinstance(getattr(self, 'pointCloud', None), pd.DataFrame):
+            self.pointCloud = np.ascontiguousarray(self.pointCloud[['x', 'y', 'z']].to_numpy(dtype=np.float32))
+        
+        
+        
+    def setOrientationIndices(self):
+        '''
+        a method to store the normal axis, the orientation sign and the lateral coordinates indices of the
+        designated normal vector orientation so that they are not re-evaluated by every method using them
+
+        Returns
+        -------
+        None.
+        '''
+        
+        normalAxisIndex          = [abs(component) for component in self.normalOrientation].index(1.0)
+        self.normalAxis          = 'xyz'[normalAxisIndex]
+        self.orientationSign     = '+' if self.normalOrientation[normalAxisIndex] > 0 else '-'
+        self.lateralCoordIndices = tuple(index for index in range(3) if index != normalAxisIndex)
+
+        return
+
+
+
+    def buildRayAccelerator(self):
+        '''
+        a method to build the trimesh's bounding volume hierarchy of its triangles (r-tree) and ray intersector ahead
+        of tracking so that they are built once and reused by all the ray queries on the surface trimesh
+
+        Note: both are cached by trimesh and dropped whenever the vertices change, e.g. cropping or rotating, or the
+              trimesh is deep-copied or pickled; so this is called once the surface is in its final state.
+
+        Returns
+        -------
+        None.
+        '''
+
+        self.trimesh.triangles_tree
+        self.trimesh.ray
+
+        return
+
+
+
     def loadPointCloud(self, fileName):
         '''
         a method to load a point cloud data file with the surface topography
@@ -102,19 +198,24 @@ class surface:
         
         print(' - loading a point cloud from file: {}...'.format(fileName))
               
-        # == read in the point cloud data file into a dataframe
-        self.pointCloud   = pd.DataFrame(data=np.loadtxt(fileName), columns=['x', 'y', 'z'])
-        # == shift the area center to the origin (0, 0, 0)
-        self.pointCloud.x -= (np.max(self.pointCloud.x) - np.min(self.pointCloud.x)) / 2.0
-        self.pointCloud.y -= (np.max(self.pointCloud.y) - np.min(self.pointCloud.y)) / 2.0
-        # == shift to the mean height
-        self.pointCloud.z = (self.pointCloud.z - np.mean(self.pointCloud.z))
+        # == read in the point cloud data file using the pandas C parser and store it as an (nx3) float32 array
+        self.pointCloud   = np.ascontiguousarray(pd.read_csv(fileName, sep=r'\s+', header=None, names=['x', 'y', 'z'],
+                                                             dtype=np.float32, engine='c', memory_map=True).to_numpy(dtype=np.float32))
+        # == shift the area center to the origin (0, 0, 0) and the heights to the mean height in a single subtraction
+        #= the lateral minima and maxima are each reduced over both lateral axes in a single call
+        points        = self.pointCloud
+        lateralMin    = points[:, :2].min(axis=0)
+        lateralMax    = points[:, :2].max(axis=0)
+        shift         = np.empty(3, dtype=points.dtype)
+        shift[:2]     = 0.5*(lateralMax + lateralMin)
+        shift[2]      = points[:, 2].mean(dtype=np.float64)
+        self.pointCloud -= shift
         
         return
     
     
     
-    def createTriangularMesh(self, depth=6, scale=1.0):
+    def createTriangularMesh(self, depth=6, scale=1.0, cacheDir=None, nThreads=None):
         '''
         a method to create a triangulated mesh from point cloud data using the Poisson surface reconstruction method
         
@@ -128,6 +229,15 @@ class surface:
                 The scale parameter of the Poisson surface reconstruction method.
                 Use steps of 0.1. Lower value yields higher details but also yields artifacts.
                 The default is 1.0.
+        cacheDir : string, optional
+                   Directory to cache the triangulated mesh in, keyed by the point cloud data and the Poisson
+                   reconstruction parameters, so that re-triangulating the same point cloud loads the cached mesh
+                   instead of re-running the reconstruction.
+                   The default is None, i.e. no caching.
+        nThreads : int, optional
+                   Number of threads used by the Poisson surface reconstruction; -1 uses all available cores.
+                   Only supported by Open3D versions whose create_from_point_cloud_poisson() has the n_threads argument.
+                   The default is None, i.e. Open3D's default.
         For more information on the Poisson reconstruction method, refer to the article:
         https://towardsdatascience.com/5-step-guide-to-generate-3d-meshes-from-point-clouds-with-python-36bad397d8ba
         
@@ -147,17 +257,34 @@ class surface:
             raise AttributeError('The pointCloud attribute was not found...\n'
                                  +'Did you forget to first load a point cloud?')
         
+        # == load the mesh from the cache if the same point cloud was already triangulated with the same parameters
+        if cacheDir is not None:
+            cacheKey      = hashlib.blake2b(TRIANGULATION_CACHE_TAG + np.ascontiguousarray(self.pointCloud).tobytes()
+                                            + struct.pack('<id', int(depth), float(scale))).hexdigest()[:16]
+            cacheFileName = os.path.join(cacheDir, cacheKey+'.pkl')
+            if os.path.isfile(cacheFileName):
+                print(' - loading the cached triangulated mesh: {}...'.format(cacheFileName))
+                #= a truncated cache file is treated as a cache miss, i.e. the mesh is triangulated and cached again
+                try:
+                    with open(cacheFileName, 'rb') as cacheFile:
+                        cachedTrimesh = pickle.load(cacheFile)
+                except (pickle.UnpicklingError, EOFError):
+                    print(' - the cached triangulated mesh is corrupted, triangulating again...')
+                else:
+                    self.trimesh             = cachedTrimesh
+                    self.faceNormals         = self.trimesh.face_normals.copy()
+                    self.triangulationParams = {'depth': depth, 'scale': scale}
+                    return
+        
         # == create an initial mesh with open 3D
         pointCloud_open3d        = open3d.geometry.PointCloud()
-        pointCloud_open3d.points = open3d.utility.Vector3dVector(self.pointCloud.to_numpy())
+        pointCloud_open3d.points = open3d.utility.Vector3dVector(self.pointCloud.astype(np.float64))
         # == estimate normal vectors for later usage in trangulating the surface
-        pointCloud_open3d.normals = open3d.utility.Vector3dVector(np.zeros((1, 3)))  # invalidate existing normal vectors
-        pointCloud_open3d.estimate_normals()
+        pointCloud_open3d.normals = open3d.utility.Vector3dVector(self.estimatePointCloudNormals())
         # == triangulate using the Poisson surface method
-        poisson_mesh = open3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pointCloud_open3d,
-                                                                                    depth=int(depth),
-                                                                                    scale=scale,
-                                                                                    linear_fit=False)[0]
+        poissonParams = {'depth': int(depth), 'scale': scale, 'linear_fit': False}
+        if nThreads is not None: poissonParams['n_threads'] = int(nThreads)
+        poisson_mesh  = open3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pointCloud_open3d, **poissonParams)[0]
         # == cut to the original area from the artificially extended one after triangulation (caveat with Poisson surfaces method)
         bbox                = pointCloud_open3d.get_axis_aligned_bounding_box()
         croppedPoisson_mesh = poisson_mesh.crop(bbox)
@@ -166,14 +293,83 @@ class surface:
         open3d_vertices      = np.asarray(croppedPoisson_mesh.vertices)
         open3d_vertexNormals = np.asarray(croppedPoisson_mesh.vertex_normals)  # different from the triangle normal vectors
         # == create Trimesh triangular mesh from open3d vertices and faces
-        self.trimesh = trimesh.Trimesh(open3d_vertices, open3d_triangles, vertex_normals=open3d_vertexNormals)
+        #  Note: - the Poisson reconstructed mesh is already clean, so Trimesh's merging/removal post-processing is skipped
+        #        - the vertices and normals are kept as float64 (unlike the float32 point cloud) since Trimesh stores them
+        #          as float64 regardless, i.e. down-casting here would only add a copy back to float64.
+        self.trimesh = trimesh.Trimesh(vertices=open3d_vertices, faces=open3d_triangles, vertex_normals=open3d_vertexNormals,
+                                       process=False, validate=False)
         #self.trimesh = self.trimesh.process(validate=True)
+        #= compute the triangles' normal vectors once; they are then only transformed along with the area
+        self.faceNormals         = self.trimesh.face_normals.copy()
         self.triangulationParams = {'depth': depth, 'scale': scale}
         
+        # == cache the triangulated mesh
+        #  Note: the mesh is dumped to a temporary file that is then moved onto the cache file in a single step, so
+        #        the parallel workers of createBatch() never read or leave behind a partially written cache file.
+        if cacheDir is not None:
+            os.makedirs(cacheDir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=cacheDir, suffix='.tmp', delete=False) as cacheFile:
+                try:
+                    pickle.dump(self.trimesh, cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+                except BaseException:
+                    cacheFile.close()
+                    os.remove(cacheFile.name)
+                    raise
+            os.replace(cacheFile.name, cacheFileName)
+        
         return
         
     
     
+    def estimatePointCloudNormals(self, numberOfNeighbors=30, chunkSize=2**16):
+        '''
+        a method to estimate the normal vectors of the point cloud using a principal component analysis of
+        the nearest neighbors of each point
+        Note: the normal vector of a point is the eigen vector with the smallest eigen value of the covariance
+              matrix of its nearest neighbors. Since the point cloud is a height map, the normal vectors are
+              oriented towards the +z direction.
+
+        Parameters
+        ----------
+        numberOfNeighbors : int, optional
+                            Number of nearest neighbors used to estimate each normal vector.
+                            The default is 30 (same as Open3D's default).
+        chunkSize : int, optional
+                    Number of points whose normal vectors are estimated at once to limit the memory usage.
+                    The default is 2**16.
+
+        Returns
+        -------
+        normals : (nx3) array of floats
+                  Unit normal vectors of the point cloud points.
+        '''
+        
+        points = self.pointCloud.astype(np.float64)
+        
+        # == find the nearest neighbors of all points at once
+        #  Note: the workers argument was named n_jobs in scipy < 1.6 (the last versions available for python 3.6)
+        tree       = cKDTree(points)
+        try:
+            _, indices = tree.query(points, k=min(numberOfNeighbors, len(points)), workers=-1)
+        except TypeError:
+            _, indices = tree.query(points, k=min(numberOfNeighbors, len(points)), n_jobs=-1)
+        
+        # == estimate the normal vectors in chunks from the neighbors covariance matrices
+        normals = np.empty_like(points)
+        for start in range(0, len(points), chunkSize):
+            neighbors              = points[indices[start:start+chunkSize]]
+            neighbors             -= neighbors.mean(axis=1, keepdims=True)
+            covariances            = np.einsum('nki,nkj->nij', neighbors, neighbors)
+            _, eigenVectors        = np.linalg.eigh(covariances)
+            normals[start:start+chunkSize] = eigenVectors[:, :, 0]
+        
+        # == orient the normal vectors towards +z
+        normals[normals[:, 2] < 0.0] *= -1
+        
+        return normals
+    
+    
+    
     def applyDefaultOrientation(self):
         '''
         a method to orient a triangulated area based on its designated normal vector orientation
@@ -198,18 +394,14 @@ class surface:
                                  +'Did you forget to first run createTriangularMesh(depth, scale) to triangulate the area?')
         
         # == rotate the triangulated area according to the designated orientation
-        if self.normalOrientation   ==  (1.0, 0.0, 0.0): self.rotateArea('y',  90)
-        elif self.normalOrientation == (-1.0, 0.0, 0.0): self.rotateArea('y', -90)
-        elif self.normalOrientation ==  (0.0, 1.0, 0.0): self.rotateArea('x', -90)
-        elif self.normalOrientation == (0.0, -1.0, 0.0): self.rotateArea('x',  90)
-        elif self.normalOrientation ==  (0.0, 0.0, 1.0): pass
-        elif self.normalOrientation == (0.0, 0.0, -1.0): self.rotateArea('x', 180)
+        defaultRotation = defaultOrientationRotations[self.normalOrientation]
+        if defaultRotation: self.rotateArea(*defaultRotation)
         
         # == crop the triangulated area by a small margin (5%) to eliminate the closure triangles created by Trimesh
         #    This will also add/update the samplingBounds attribute, which is limits on the area to sample within it
         #    the first intersection point while tracking
         #= get the lateral coordinates indices
-        lateralCoordIndices = np.where(np.asarray(self.normalOrientation) == 0.0)[0]
+        lateralCoordIndices = self.lateralCoordIndices
         #= get the crop limits
         ax1_limits = [self.trimesh.bounds[0, lateralCoordIndices[0]]+0.025*self.trimesh.extents[lateralCoordIndices[0]],
                       self.trimesh.bounds[1, lateralCoordIndices[0]]-0.025*self.trimesh.extents[lateralCoordIndices[0]]]
@@ -246,6 +438,12 @@ class surface:
                     The scale parameter of the Poisson surface reconstruction method.
                     Use steps of 0.1. Higher value yields higher details but also yields artifacts.
                     The default is 1.0.            
+            cacheDir : string, optional
+                       Directory to cache the triangulated mesh in.
+                       The default is None, i.e. no caching.
+            nThreads : int, optional
+                       Number of threads used by the Poisson surface reconstruction.
+                       The default is None, i.e. Open3D's default.
 
         Returns
         -------
@@ -259,19 +457,21 @@ class surface:
             
             # == crop the original point cloud and restore
             print(' - cropping the point cloud to axis1={}um, axis2={}um...'.format(kwargs['ax1_limits'],kwargs['ax2_limits']))
-            self.pointCloud = self.pointCloud.iloc[np.where( (self.pointCloud.x > ax1_low) &
-                                                             (self.pointCloud.x < ax1_high) &
-                                                             (self.pointCloud.y > ax2_low) &
-                                                             (self.pointCloud.y < ax2_high)
-                                                            )
-                                                   ]
-            self.pointCloud.reset_index(drop=True, inplace=True)
+            xs   = self.pointCloud[:, 0]
+            ys   = self.pointCloud[:, 1]
+            mask = np.empty(xs.size, dtype=bool)
+            np.greater(xs, ax1_low, out=mask)
+            np.logical_and(mask, xs < ax1_high, out=mask)
+            np.logical_and(mask, ys > ax2_low, out=mask)
+            np.logical_and(mask, ys < ax2_high, out=mask)
+            self.pointCloud = self.pointCloud[mask]
         
         # == retriangulate
         if 'depth' in kwargs and 'scale' in kwargs:
-            self.createTriangularMesh(depth=kwargs['depth'], scale=kwargs['scale'])
+            self.createTriangularMesh(depth=kwargs['depth'], scale=kwargs['scale'],
+                                      cacheDir=kwargs.get('cacheDir'), nThreads=kwargs.get('nThreads'))
         else:
-            self.createTriangularMesh()
+            self.createTriangularMesh(cacheDir=kwargs.get('cacheDir'), nThreads=kwargs.get('nThreads'))
         
         # == reapply the default orientation
         self.applyDefaultOrientation()
@@ -304,8 +504,7 @@ class surface:
         print(' - rotating the surface features by {:2.2f} deg...'.format(rotAngle))
         
         # == rotate the previously oriented area around the surface designated orientation
-        rotAxis = np.extract(np.abs(np.asarray(self.normalOrientation)) == 1.0, ['x', 'y', 'z'])[0]
-        self.rotateArea(rotAxis, rotAngle)
+        self.rotateArea(self.normalAxis, rotAngle)
         
         # == plot the area after surface features rotation for visual confirmation
         # print(' - Generating plots...')
@@ -315,7 +514,7 @@ class surface:
     
     
     
-    def cropTriangulatedArea(self, ax1_limits, ax2_limits):
+    def cropTriangulatedArea(self, ax1_limits, ax2_limits, exactEdges=False):
         '''
         a method to crop an already triangulated and oriented area
         Note: - it is recommended to crop the triangulated area, even by a small margin,
@@ -330,6 +529,11 @@ class surface:
                      the limits on the first axis of the desired cropped area.
         ax2_limits : list of float numbers,
                      the limits on the second axis of the desired cropped area.
+        exactEdges : bool, optional
+                     Whether to clip the triangles crossing the limits with 4 bounding planes so that the cropped
+                     area edges are exactly at the limits. Otherwise, only the triangles with all their vertices
+                     within the limits are kept, which is much faster for large meshes.
+                     The default is False.
 
         Returns
         -------
@@ -342,23 +546,41 @@ class surface:
         ax1_low, ax1_high = ax1_limits
         ax2_low, ax2_high = ax2_limits
         
-        # == create the bounding 4 parallel planes to the designated orientation
-        lateralCoordIndices = np.where(np.asarray(self.normalOrientation) == 0.0)[0]
-        #
-        planesOrigin = np.zeros([4, 3])
-        planesOrigin[0, lateralCoordIndices[0]] = ax1_low
-        planesOrigin[1, lateralCoordIndices[0]] = ax1_high
-        planesOrigin[2, lateralCoordIndices[1]] = ax2_low
-        planesOrigin[3, lateralCoordIndices[1]] = ax2_high
+        lateralCoordIndices = self.lateralCoordIndices
         #
         shiftingArray = np.zeros(3)
         shiftingArray[lateralCoordIndices[0]] = (ax1_high - ax1_low)/2.0 + ax1_low
         shiftingArray[lateralCoordIndices[1]] = (ax2_high - ax2_low)/2.0 + ax2_low
-        #
-        planesNormal = -1*np.sign(planesOrigin)
-        #
-        # == crop the orientedTrimesh using the created bounding 4 planes
-        self.trimesh = self.trimesh.slice_plane(planesOrigin, planesNormal)
+        
+        if exactEdges:
+            # == create the bounding 4 parallel planes to the designated orientation
+            planesOrigin = np.zeros([4, 3])
+            planesOrigin[0, lateralCoordIndices[0]] = ax1_low
+            planesOrigin[1, lateralCoordIndices[0]] = ax1_high
+            planesOrigin[2, lateralCoordIndices[1]] = ax2_low
+            planesOrigin[3, lateralCoordIndices[1]] = ax2_high
+            #
+            planesNormal = -1*np.sign(planesOrigin)
+            #
+            # == crop the orientedTrimesh using the created bounding 4 planes
+            self.trimesh     = self.trimesh.slice_plane(planesOrigin, planesNormal)
+            self.faceNormals = self.trimesh.face_normals.copy()
+        else:
+            # == crop the orientedTrimesh to the triangles with all their vertices within the lateral limits
+            vertices      = self.trimesh.vertices
+            faces         = self.trimesh.faces
+            ax1, ax2      = lateralCoordIndices
+            withinLimits  = ((vertices[:, ax1] > ax1_low) & (vertices[:, ax1] < ax1_high) &
+                             (vertices[:, ax2] > ax2_low) & (vertices[:, ax2] < ax2_high))
+            facesMask     = withinLimits[faces].all(axis=1)
+            #= re-index the kept faces to the kept vertices only
+            keptVertices, keptFaces = np.unique(faces[facesMask], return_inverse=True)
+            self.faceNormals = self.faceNormals[facesMask]
+            self.trimesh  = trimesh.Trimesh(vertices=vertices[keptVertices],
+                                            faces=keptFaces.reshape(-1, 3),
+                                            face_normals=self.faceNormals,
+                                            vertex_normals=self.trimesh.vertex_normals[keptVertices],
+                                            process=False, validate=False)
         # == shift the cropped orientedTrimesh center to the origin (0, 0, 0)
         self.trimesh = self.trimesh.apply_translation(shiftingArray)
         
@@ -395,30 +617,38 @@ class surface:
         '''
         
         # == convert to radians
-        theta = rotAngle*(np.pi/180) 
+        theta = rotAngle*(np.pi/180)
+        c, s  = np.cos(theta), np.sin(theta)
         
-        # == construct the rotation matrix
+        # == construct the 3x3 rotation matrix
         if rotAxis == 'x':
-            M = np.array([[1,             0,              0, 0],
-                          [0, np.cos(theta), -np.sin(theta), 0],
-                          [0, np.sin(theta),  np.cos(theta), 0],
-                          [0,             0,              0, 1]
+            R = np.array([[1, 0,  0],
+                          [0, c, -s],
+                          [0, s,  c]
                         ])
         elif rotAxis == 'y':
-            M = np.array([[ np.cos(theta), 0,  np.sin(theta), 0],
-                          [             0, 1,              0, 0],
-                          [-np.sin(theta), 0,  np.cos(theta), 0],
-                          [             0, 0,              0, 1]
+            R = np.array([[ c, 0, s],
+                          [ 0, 1, 0],
+                          [-s, 0, c]
                         ])
         elif rotAxis == 'z':
-            M = np.array([[np.cos(theta), -np.sin(theta), 0, 0],
-                          [np.sin(theta),  np.cos(theta), 0, 0],
-                          [            0,              0, 1, 0],
-                          [            0,              0, 0, 1]
+            R = np.array([[c, -s, 0],
+                          [s,  c, 0],
+                          [0,  0, 1]
                         ])
         
-        # == rotate the triangulated area
-        self.trimesh = self.trimesh.apply_transform(M)
+        # == rotate the triangulated area vertices and normal vectors directly with the 3x3 matrix
+        #    Note: - rotations preserve the unit length of the normal vectors, so they are only rotated and re-assigned
+        #            rather than being recomputed by Trimesh.
+        #          - the rotated arrays are new arrays rather than written in place since Trimesh may mark the arrays
+        #            it was given as read-only, e.g. the face normals after a crop or unpickling.
+        #          - the rotated vertices are re-assigned to the trimesh to invalidate its cached properties, e.g. bounds.
+        vertices         = np.matmul(self.trimesh.vertices.view(np.ndarray), R.T)
+        vertexNormals    = np.matmul(np.asarray(self.trimesh.vertex_normals), R.T)
+        self.faceNormals = np.matmul(self.faceNormals, R.T)
+        self.trimesh.vertices       = vertices
+        self.trimesh.face_normals   = self.faceNormals.copy()
+        self.trimesh.vertex_normals = vertexNormals
         
         # == store the applied rotation angle to the original trimesh
         self.rotAngle = rotAngle
@@ -443,24 +673,32 @@ class surface:
         '''
         
         #= retrieving the normal on the foramt of a string
-        normalAxis = np.extract(np.abs(np.asarray(self.normalOrientation)) == 1.0, ['x', 'y', 'z'])[0]
-        orientation = '+' if np.all(np.asarray(self.normalOrientation) >= 0) else '-'
+        normalAxis  = self.normalAxis
+        orientation = self.orientationSign
         
         # == plotting the distribution of the normal vectors componnets
-        plt.figure(figsize = (22, 16))
-        plt.title("distribution of {} area triangles' normal vectors' components for the {} surface".format(tag+' '+self.surfaceFinish, orientation+normalAxis), loc = 'left', fontsize=22)
-        bins = np.arange(-1.0, 1.0+0.001, 0.001)
-        plt.hist(self.trimesh.face_normals[:, 0], bins=bins, histtype='step', color = 'xkcd:lightish blue', linestyle='-', linewidth = 1.1, label = 'x')
-        plt.hist(self.trimesh.face_normals[:, 1], bins=bins, histtype='step', color = 'xkcd:wine', linestyle='-', linewidth = 1.1, label = 'y')
-        plt.hist(self.trimesh.face_normals[:, 2], bins=bins, histtype='step', color = 'xkcd:blue green', linestyle='-', linewidth = 1.1, label = 'z')
-        plt.xlabel('component value', fontsize=22)
-        plt.xlim(-1.1, 1.1)
-        plt.ylabel('count', fontsize=22)
-        plt.yscale('log')
-        plt.tick_params(axis='both', which='major', labelsize=20)
-        plt.legend(loc='upper right', fontsize=22, frameon=True, edgecolor='k', framealpha=1.0)
-        sns.set(context='notebook', style='darkgrid', palette='deep', font='sans-serif', font_scale=1, color_codes=True, rc=None)
-        plt.savefig('distribution_of_{}_area_triangles_normal_vectors_components_for_the_{}_surface.png'.format(tag+' '+self.surfaceFinish, orientation+normalAxis), bbox_inches='tight', dpi = 200)
+        #  Note: the figures use the constrained layout instead of a tight bounding box on saving, which avoids
+        #        rendering each figure twice, and are closed right after saving to release their memory.
+        fig, ax = plt.subplots(figsize = (22, 16), constrained_layout=True)
+        ax.set_title("distribution of {} area triangles' normal vectors' components for the {} surface".format(tag+' '+self.surfaceFinish, orientation+normalAxis), loc = 'left', fontsize=22)
+        #= the bins are uniform with a 0.001 width over [-1, 1], so the bin index of each component is obtained directly
+        #  and the counts of all three components are acquired in a single bincount by offsetting each component's indices
+        #  Note: the counts are drawn as weighted step histograms rather than with ax.stairs(), which needs matplotlib >= 3.4
+        bins    = np.arange(-1.0, 1.0+0.001, 0.001)
+        nBins   = bins.size - 1
+        indices = np.clip(((self.faceNormals + 1.0)*1000.0).astype(np.int32), 0, nBins-1)
+        counts  = np.bincount((indices + np.arange(3, dtype=np.int32)*nBins).ravel(), minlength=3*nBins).reshape(3, nBins)
+        ax.hist(bins[:-1], bins=bins, weights=counts[0], histtype='step', color = 'xkcd:lightish blue', linestyle='-', linewidth = 1.1, label = 'x')
+        ax.hist(bins[:-1], bins=bins, weights=counts[1], histtype='step', color = 'xkcd:wine', linestyle='-', linewidth = 1.1, label = 'y')
+        ax.hist(bins[:-1], bins=bins, weights=counts[2], histtype='step', color = 'xkcd:blue green', linestyle='-', linewidth = 1.1, label = 'z')
+        ax.set_xlabel('component value', fontsize=22)
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylabel('count', fontsize=22)
+        ax.set_yscale('log')
+        ax.tick_params(axis='both', which='major', labelsize=20)
+        ax.legend(loc='upper right', fontsize=22, frameon=True, edgecolor='k', framealpha=1.0)
+        fig.savefig('distribution_of_{}_area_triangles_normal_vectors_components_for_the_{}_surface.png'.format(tag+' '+self.surfaceFinish, orientation+normalAxis), dpi = 200)
+        plt.close(fig)
         
         # == plotting the triangulated surface
         if normalAxis == 'x':
@@ -473,9 +711,8 @@ class surface:
             x, y, z = (self.trimesh.vertices[:, 0], self.trimesh.vertices[:, 1], self.trimesh.vertices[:, 2])
             xlabel, ylabel, zlabel = ('x', 'y', 'z')
         #    
-        fig = plt.figure(figsize = (24, 16))
-        ax = fig.gca(projection='3d')
-        plt.title('{} area height map for the {} surface'.format(tag+' '+self.surfaceFinish, orientation+normalAxis), loc = 'left', fontsize=22)
+        fig, ax = plt.subplots(figsize = (24, 16), subplot_kw={'projection': '3d'}, constrained_layout=True)
+        ax.set_title('{} area height map for the {} surface'.format(tag+' '+self.surfaceFinish, orientation+normalAxis), loc = 'left', fontsize=22)
         cmap = plt.cm.viridis
         norm = mpl.colors.Normalize(vmin = -0.5, vmax = 0.5)
         alpha  = 0.3
@@ -483,31 +720,70 @@ class surface:
         ax.set_xlabel(xlabel+' ($\mu m$)', fontsize = 22, labelpad=22)
         ax.set_ylabel(ylabel+' ($\mu m$)', fontsize = 22, labelpad=22)
         ax.set_zlabel(zlabel+' ($\mu m$)', fontsize = 22, rotation=10, labelpad=22)
-        cbar = plt.colorbar(surf)
+        cbar = fig.colorbar(surf, ax=ax)
         #cbar = plt.colorbar(surf, shrink=0.8, aspect=4)
         #cbar.set_label('', size=22)
         cbar.ax.tick_params(labelsize=22)
         ax.view_init(azim=45.0, elev=60.0)
         ax.tick_params(axis='both', which='major', labelsize=22)
-        sns.set(context='notebook', style='darkgrid', palette='deep', font='sans-serif', font_scale=1, color_codes=True, rc=None)
-        plt.savefig('{}_area_height_map_for_the_{}_surface.png'.format(tag+'_'+self.surfaceFinish, orientation+normalAxis),  bbox_inches='tight', dpi = 300)
+        fig.savefig('{}_area_height_map_for_the_{}_surface.png'.format(tag+'_'+self.surfaceFinish, orientation+normalAxis), dpi = 300)
+        plt.close(fig)
 
         return
 
 
+def createSurface(surfaceName, surfaceFinish, normalOrientation, pointCloudFileName, cacheDir=None):
+    '''
+    a method to create a surface from a point cloud file, triangulate it, apply its default orientation and save it
+    
+    Parameters
+    ----------
+    surfaceName : string,
+                  name prefix of the saved surface pickle file '<surfaceName>_<surfaceFinish>_<normalOrientation>.pkl'.
+    surfaceFinish : string,
+                    short acronym describing the surface finish/roughness.
+    normalOrientation : string,
+                        the surface normal vector orientation from the list [-x, +x, -y, +y, -z, +z].
+    pointCloudFileName : string,
+                         file name of the surface point cloud data.
+    cacheDir : string, optional
+               Directory to cache the triangulated mesh in.
+               The default is None, i.e. no caching.
+
+    Returns
+    -------
+    surfaceFileName : string,
+                      file name of the saved surface pickle file.
+    '''
+    
+    aSurface = surface(surfaceFinish, normalOrientation)
+    aSurface.loadPointCloud(pointCloudFileName)
+    aSurface.createTriangularMesh(cacheDir=cacheDir)
+    aSurface.applyDefaultOrientation()
+    aSurface.plotTriangulatedArea('original')
+    #
+    surfaceFileName = surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'.pkl'
+    pickle.dump(aSurface, open(surfaceFileName,'wb'), protocol=pickle.HIGHEST_PROTOCOL)
+    
+    return surfaceFileName
+
+
 #%% main
 
 
 if __name__ == '__main__':
     '''
         main function to execute according to the "command" variable
-        command: 'create' or 'cropPointCloudAndReTriangulate' or 'rotateFeatures' or 'cropTriangulatedSurface'
+        command: 'create' or 'createBatch' or 'cropPointCloudAndReTriangulate' or 'rotateFeatures' or 'cropTriangulatedSurface'
     '''
     
     resetIPython()
     
     command  = sys.argv[1]
     
+    #= directory to cache triangulated meshes in to skip re-running the Poisson reconstruction on the same point cloud
+    meshCacheDir = '.mesh_cache'
+    
     if command == 'create':
         
         surfaceName        = sys.argv[2]
@@ -515,12 +791,19 @@ if __name__ == '__main__':
         normalOrientation  = sys.argv[4]
         pointCloudFileName = sys.argv[5]
     
-        aSurface = surface(surfaceFinish, normalOrientation)
-        aSurface.loadPointCloud(pointCloudFileName)
-        aSurface.createTriangularMesh()
-        aSurface.applyDefaultOrientation()
-        aSurface.plotTriangulatedArea('original')
-        pickle.dump(aSurface, open(surfaceName+'_'+surfaceFinish+'_'+normalOrientation+'.pkl','wb'), protocol=2)
+        createSurface(surfaceName, surfaceFinish, normalOrientation, pointCloudFileName, cacheDir=meshCacheDir)
+        
+    if command == 'createBatch':
+        
+        #= manifest csv file with the columns: surfaceName, surfaceFinish, normalOrientation, pointCloudFileName
+        #  Each row is created in a separate process so that the independent reconstructions run in parallel.
+        manifestFileName = sys.argv[2]
+        numberOfProcesses = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        
+        manifest = pd.read_csv(manifestFileName, skipinitialspace=True)
+        with multiprocessing.Pool(processes=numberOfProcesses) as pool:
+            pool.starmap(createSurface, [(row.surfaceName, row.surfaceFinish, row.normalOrientation, row.pointCloudFileName, meshCacheDir)
+                                         for row in manifest.itertuples(index=False)])
         
     if command == 'cropPointCloudAndReTriangulate':
         
@@ -532,6 +815,7 @@ if __name__ == '__main__':
         if len(sys.argv) > 5:
             kwargs['depth']       = float(sys.argv[5])
             kwargs['scale']       = float(sys.argv[6])
+        kwargs['cacheDir'] = meshCacheDir
             
         aSurface = pickle.load(open(surfaceName+'.pkl', 'rb'))
         aSurface.cropPointCloudAndReTriangulate(**kwargs)
@@ -546,7 +830,7 @@ if __name__ == '__main__':
         aSurface.rotateSurfaceFeatures(rotationAngle)
         aSurface.plotTriangulatedArea('rotated')
         
-        pickle.dump(aSurface, open(surfaceName+'_rotated'+'.pkl','wb'), protocol=2)
+        pickle.dump(aSurface, open(surfaceName+'_rotated'+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
         
     if command == 'cropTriangulatedSurface':
         
@@ -558,6 +842,6 @@ if __name__ == '__main__':
         aSurface.cropTriangulatedArea(ax1_limits, ax2_limits)
         aSurface.plotTriangulatedArea('cropped')
         
-        pickle.dump(aSurface, open(surfaceName+'_cropped'+'.pkl','wb'), protocol=2)
+        pickle.dump(aSurface, open(surfaceName+'_cropped'+'.pkl','wb'), protocol=pickle.HIGHEST_PROTOCOL)
         
         
\ No newline at end of file
@@ -9,13 +9,44 @@
 
 
 import sys
+import math
+import multiprocessing
 
 import numpy as np
-import copy
+from scipy.special import ndtr, ndtri
+
+import volume
+
+
+#= random number generator of the tracking samples
+RNG = np.random.default_rng()
+
+#= geometry volumes of a worker process tracking photon batches in parallel, set once by the pool initializer
+WORKER_VOLUME_LIST = None
+
+#= number of the uniform and normal samples drawn at once into the random buffers of the per-interaction samples
+RANDOM_BUFFER_SIZE = 256
+
+#= tolerance on the distances between the photon origin and intersection points in um
+#  Note: the coordinates are kept in float64 since features of sub-um scale are tracked at positions up to 1E5 um
+#        away from the origin, where float32 has a resolution of ~1E-2 um.
+DISTANCE_TOLERANCE = 1E-9
+
+#= speed of light in vacuum in um/ns
+SPEED_OF_LIGHT = 299792458*1E-3
+
+#= side plane designations indexed by 2*(normal axis index) + (normal component along the axis > 0)
+PLANE_ORIENTATION_LABELS = ('-x', '+x', '-y', '+y', '-z', '+z')
+
+#= (lateral, lateral, vertical) coordinates indices of each encoded normal vector key
+AXIS_INDICES = {normalKey: tuple(i for i in range(3) if i != 'xyz'.index(side[1])) + ('xyz'.index(side[1]),)
+                for side, normalKey in volume.NORMAL_KEYS.items()}
 
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
@@ -23,9 +54,315 @@ def resetIPython():
 
 
 
-def getVolumeTrimeshIntersection(volumeList, opPosition, opMomentumDir, opVolume):
+class randomBuffer:
+    
+    def __init__(self, rng, size = RANDOM_BUFFER_SIZE):
+        '''
+        random buffer instantiation
+        
+        Note: the per-interaction samples are consumed one at a time from blocks of pre-drawn samples, since
+              a scalar draw from the generator costs ~1 us of call overhead regardless of the actual sampling work.
+
+        Parameters
+        ----------
+        rng  : numpy Generator
+               Random number generator the blocks are drawn from.
+        size : int, optional
+               Number of samples drawn per block.
+               The default is RANDOM_BUFFER_SIZE.
+
+        Returns
+        -------
+        None.
+
+        '''
+        
+        self.rng  = rng
+        self.size = size
+        #= the blocks are stored as lists of floats for a fast scalar indexing
+        self.uniformBlock  = []
+        self.uniformCursor = 0
+        self.normalBlock   = []
+        self.normalCursor  = 0
+        
+        
+        
+    def uniform(self):
+        '''
+        consuming a uniform sample in [0, 1) from the buffer, and refilling the buffer once it is exhausted
+
+        Returns
+        -------
+        float
+
+        '''
+        
+        if self.uniformCursor == len(self.uniformBlock):
+            self.uniformBlock  = self.rng.random(self.size).tolist()
+            self.uniformCursor = 0
+        self.uniformCursor += 1
+        
+        return self.uniformBlock[self.uniformCursor-1]
+    
+    
+    
+    def normal(self, loc = 0.0, scale = 1.0):
+        '''
+        consuming a standard normal sample from the buffer, and refilling the buffer once it is exhausted
+
+        Parameters
+        ----------
+        loc   : float, optional
+                Mean of the normal distribution.
+                The default is 0.0.
+        scale : float or array of floats, optional
+                Standard deviation of the normal distribution.
+                The default is 1.0.
+
+        Returns
+        -------
+        float or array of floats
+
+        '''
+        
+        if self.normalCursor == len(self.normalBlock):
+            self.normalBlock  = self.rng.standard_normal(self.size).tolist()
+            self.normalCursor = 0
+        self.normalCursor += 1
+        
+        return loc + scale*self.normalBlock[self.normalCursor-1]
+    
+    
+    
+#= buffer of the per-interaction random samples
+RANDOM_BUFFER = randomBuffer(RNG)
+
+
+
+def seedRNG(seed):
     '''
-    intersecting geometry volumes to find the first intersection point, plane, and next volume
+    seeding the random number generator of the tracking samples and discarding the previously buffered samples
+
+    Parameters
+    ----------
+    seed : int
+           Seed of the PCG64 generator.
+
+    Returns
+    -------
+    None.
+
+    '''
+    
+    global RNG, RANDOM_BUFFER
+    RNG           = np.random.default_rng(seed)
+    RANDOM_BUFFER = randomBuffer(RNG)
+    
+    return
+
+
+
+def intersectVolumeTriangles(aVolume, opPositions, opMomentumDirs, chunkSize=2**14):
+    '''
+    intersecting rays with a volume's triangles using a vectorized Moller-Trumbore test over all rays and triangles
+
+    The returned values follow trimesh's ray.intersects_location() with multiple_hits, i.e. all forward hits of
+    each ray with duplicate hits on the shared edges of triangles removed, except that the photon origin is never
+    returned as a hit if it is exactly on a volume boundary, e.g. right after a reflection on the reflector.
+
+    Parameters
+    ----------
+    aVolume        : volume object
+                     Volume with the triangle arrays of its volume trimesh.
+    opPositions    : (Mx3) array of floats
+                     Photons' origin positions in um.
+    opMomentumDirs : (Mx3) array of floats
+                     Photons' momentum direction unit vectors.
+    chunkSize      : int, optional
+                     Number of rays intersected at once to limit the memory usage of the (rays x triangles) arrays
+                     for large cohorts of photons.
+                     The default is 2**14.
+
+    Returns
+    -------
+    intersect_locs : (nx3) array of floats
+                     Intersection points in um.
+    intersect_rays : (n,) array of ints
+                     Index of the ray of each intersection.
+    intersect_tris : (n,) array of ints
+                     Index of the intersected triangle of each intersection.
+
+    '''
+
+    opPositions    = np.asarray(opPositions, dtype=np.float64).reshape(-1, 1, 3)
+    opMomentumDirs = np.asarray(opMomentumDirs, dtype=np.float64).reshape(-1, 1, 3)
+
+    #= intersect large cohorts of rays in chunks and offset the ray indices of each chunk
+    if len(opPositions) > chunkSize:
+        chunksIntersects = [intersectVolumeTriangles(aVolume, opPositions[start:start+chunkSize], opMomentumDirs[start:start+chunkSize], chunkSize)
+                            for start in range(0, len(opPositions), chunkSize)]
+        intersect_locs = np.concatenate([chunk[0] for chunk in chunksIntersects]).reshape(-1, 3)
+        intersect_rays = np.concatenate([chunk[1]+start for chunk, start in zip(chunksIntersects, range(0, len(opPositions), chunkSize))])
+        intersect_tris = np.concatenate([chunk[2] for chunk in chunksIntersects])
+        return intersect_locs, intersect_rays, intersect_tris
+
+    #= Moller-Trumbore barycentric coordinates of the hit point on each triangle
+    pVectors     = np.cross(opMomentumDirs, aVolume.trianglesEdge2)
+    determinants = np.einsum('rtk,tk->rt', pVectors, aVolume.trianglesEdge1)
+    nonParallel  = np.abs(determinants) > 1E-12
+    inverseDets  = np.divide(1.0, determinants, out=np.zeros_like(determinants), where=nonParallel)
+    tVectors     = opPositions - aVolume.trianglesOrigin
+    u            = np.einsum('rtk,rtk->rt', tVectors, pVectors)*inverseDets
+    qVectors     = np.cross(tVectors, aVolume.trianglesEdge1)
+    v            = np.einsum('rtk,rtk->rt', np.broadcast_to(opMomentumDirs, qVectors.shape), qVectors)*inverseDets
+
+    #= ray-plane distance of each triangle, evaluated as in trimesh so that the hit points match its own
+    projectionDirs = np.einsum('rtk,tk->rt', np.broadcast_to(opMomentumDirs, tVectors.shape), aVolume.trianglesNormal)
+    nonParallel   &= np.abs(projectionDirs) > 1E-5
+    distances      = np.divide(np.einsum('rtk,tk->rt', -tVectors, aVolume.trianglesNormal), projectionDirs,
+                               out=np.zeros_like(projectionDirs), where=nonParallel)
+
+    #= keep the forward hits that are inside the triangles
+    hits = nonParallel & (u > -1E-12) & (v > -1E-12) & (u+v < 1+1E-12) & (distances > -1E-6)
+    intersect_rays, intersect_tris = np.nonzero(hits)
+    intersect_locs = opMomentumDirs[intersect_rays, 0]*distances[intersect_rays, intersect_tris][:, None] + opPositions[intersect_rays, 0]
+
+    #= eliminating the photon origin point that is considered an intersection point if it is exactly on a volume
+    #  boundary, i.e. within the distance tolerance
+    #  Note: unlike the pyembree accelerator, which steps its rays off their origins, the triangle test reports the
+    #        origin as a hit at zero distance.
+    originDifferences = intersect_locs - opPositions[intersect_rays, 0]
+    awayFromOrigin    = np.einsum('ij,ij->i', originDifferences, originDifferences) > DISTANCE_TOLERANCE**2
+    intersect_locs, intersect_rays, intersect_tris = intersect_locs[awayFromOrigin], intersect_rays[awayFromOrigin], intersect_tris[awayFromOrigin]
+
+    #= remove the duplicate hits of a ray on the shared edges of triangles
+    if len(intersect_rays) > 1:
+        _, unique = np.unique(np.column_stack((np.round(intersect_locs, 9), intersect_rays)), axis=0, return_index=True)
+        unique    = np.sort(unique)
+        intersect_locs, intersect_rays, intersect_tris = intersect_locs[unique], intersect_rays[unique], intersect_tris[unique]
+
+    return intersect_locs, intersect_rays, intersect_tris
+
+
+
+def rayHitsVolumeBounds(aVolume, opPositions, opMomentumDirs):
+    '''
+    checking whether rays hit a volume's axis-aligned bounding box using the slab test, to skip intersecting
+    the volume's triangles with rays that obviously miss it
+
+    Note: the bounds are padded by the same tolerance of the backward hits of intersectVolumeTriangles() so that
+          rays grazing the volume or with origins on its boundary are never skipped.
+
+    Parameters
+    ----------
+    aVolume        : volume object
+                     Volume with the bounds of its volume trimesh.
+    opPositions    : (Mx3) array of floats
+                     Photons' origin positions in um.
+    opMomentumDirs : (Mx3) array of floats
+                     Photons' momentum direction unit vectors.
+
+    Returns
+    -------
+    (M,) array of bools
+        Whether each ray hits the volume bounds.
+
+    '''
+
+    opPositions    = np.asarray(opPositions, dtype=np.float64).reshape(-1, 3)
+    opMomentumDirs = np.asarray(opMomentumDirs, dtype=np.float64).reshape(-1, 3)
+
+    #= distances along the rays to the lower and upper planes of each slab
+    #  Note: a zero direction component gives infinite distances, i.e. the slab doesn't constrain the ray if its
+    #        origin is between the slab planes and is missed otherwise.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverseDirs    = 1.0/opMomentumDirs
+        lowerDistances = (aVolume.bounds[0] - 1E-6 - opPositions)*inverseDirs
+        upperDistances = (aVolume.bounds[1] + 1E-6 - opPositions)*inverseDirs
+    entryDistances = np.nanmax(np.fmin(lowerDistances, upperDistances), axis=1)
+    exitDistances  = np.nanmin(np.fmax(lowerDistances, upperDistances), axis=1)
+
+    return (exitDistances >= entryDistances) & (exitDistances > -1E-6)
+
+
+
+def intersectVolumeBoundsExit(aVolume, opPositions, opMomentumDirs):
+    '''
+    finding the exit points and planes of rays through a volume's axis-aligned cuboid using the slab test, i.e. the
+    farthest intersections of the rays with the volume trimesh without intersecting its triangles
+
+    Note: the distances to the planes are evaluated as in intersectVolumeTriangles(), i.e. (plane - origin)/direction
+          along the plane's normal axis, so that the exit points match the farthest triangle hits.
+
+    Parameters
+    ----------
+    aVolume        : volume object
+                     Volume with the bounds of its volume trimesh.
+    opPositions    : (Mx3) array of floats
+                     Photons' origin positions in um.
+    opMomentumDirs : (Mx3) array of floats
+                     Photons' momentum direction unit vectors.
+
+    Returns
+    -------
+    exitPoints     : (Mx3) array of floats
+                     Exit points of the rays in um.
+    exitNormals    : (Mx3) array of floats
+                     Outward normal unit vectors of the exit planes.
+    hits           : (M,) array of bools
+                     Whether each ray intersects the volume; the exit points and normals of the others are meaningless.
+
+    '''
+
+    opPositions    = np.asarray(opPositions, dtype=np.float64).reshape(-1, 3)
+    opMomentumDirs = np.asarray(opMomentumDirs, dtype=np.float64).reshape(-1, 3)
+
+    #= distances along the rays to the lower and upper planes of each slab
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lowerDistances = (aVolume.bounds[0] - opPositions)/opMomentumDirs
+        upperDistances = (aVolume.bounds[1] - opPositions)/opMomentumDirs
+    farDistances   = np.fmax(lowerDistances, upperDistances)
+    entryDistances = np.nanmax(np.fmin(lowerDistances, upperDistances), axis=1)
+    exitAxes       = np.nanargmin(np.where(np.isnan(farDistances), np.inf, farDistances), axis=1)
+    rays           = np.arange(len(opPositions))
+    exitDistances  = farDistances[rays, exitAxes]
+    hits           = (exitDistances >= entryDistances) & (exitDistances > -1E-6)
+
+    #= the exit plane's outward normal is along its axis with the sign of the ray direction component
+    exitPoints                   = opMomentumDirs*exitDistances[:, None] + opPositions
+    exitNormals                  = np.zeros_like(opPositions)
+    exitNormals[rays, exitAxes]  = np.sign(opMomentumDirs[rays, exitAxes])
+
+    return exitPoints, exitNormals, hits
+
+
+
+def getClosestIntersectIndices(squaredDistances):
+    '''
+    finding the intersections at the shortest distance from the photon origin within a tolerance of 1E-9 um
+
+    Parameters
+    ----------
+    squaredDistances      : (n,) array of floats
+                            Squared distances between the photon origin and the intersections in um^2.
+
+    Returns
+    -------
+    closestIntersectIndex : (m,) array of ints
+                            Indices of the closest intersections.
+
+    '''
+
+    maxSquaredDistance = (np.sqrt(squaredDistances.min()) + DISTANCE_TOLERANCE)**2
+
+    return np.where(squaredDistances <= maxSquaredDistance)[0]
+
+
+
+def getVolumeTrimeshIntersectionInside(volumeList, opPosition, opMomentumDir, opVolume):
+    '''
+    intersecting the photon's current volume to find the first intersection point, plane, and next volume when the
+    photon is inside any of the geometry volumes
 
     Parameters
     ----------
@@ -50,146 +387,280 @@ def getVolumeTrimeshIntersection(volumeList, opPosition, opMomentumDir, opVolume
     '''
     
     #### == the photon is inside any of the geometry volumes
-    if opVolume != 'environment' and opVolume != 'reflector':
+    #= find the exit point of the current volume, i.e. its farthest intersection
+    exitPoints, exitNormals, hits = intersectVolumeBoundsExit(volumeList[opVolume], opPosition, opMomentumDir)
+    # this check is unnecessary but put here as a fail safe
+    if not hits[0]:
+        nextVolume               = None
+        volumeIntersectPoint     = None
+        intersectPlaneNormal     = None
+    else:
+        volumeIntersectPoint   = np.round(exitPoints, 9)
+        intersectPlaneNormal   = exitNormals
+        nextVolume             = volumeList[opVolume].touchingVolumes[volume.encodeNormal(intersectPlaneNormal[0])]
+        #= reverse the normal to point towards the photon's incidence volume
+        intersectPlaneNormal   *= -1
+    
+    return volumeIntersectPoint, intersectPlaneNormal, nextVolume
+
+
+
+def getVolumeTrimeshIntersectionOutside(volumeList, opPosition, opMomentumDir, opVolume):
+    '''
+    intersecting all geometry volumes to find the first intersection point, plane, and next volume when the photon
+    is at the outside 'environment' or between the reflector and a geometry volume
+
+    Parameters
+    ----------
+    volumeList    : dict of volume objects
+                    All Geometry volume objects.
+    opPosition    : (1x3) array of floats
+                    Photon's origin position in um.
+    opMomentumDir : (1x3) array of floats
+                    Photon's momentum direction unit vector.
+    opVolume      : string
+                    Photon's current associated volume.
+
+    Returns
+    -------
+    volumeIntersectPoint : (1x3) array of floats
+                           Initial intersection point on a volume in um.
+    intersectPlaneNormal : (1x3) array of floats
+                           Normal unit vector of the intersected plane.
+    nextVolume           : string
+                           Next volume to the intersected plane.
+
+    '''
+    
+    #### == the photon is at the outside 'environment' or between the reflector and a geometry volume
+    #= create lists to record the intersections info with all volumes as parallel arrays of the intersected
+    #  volumes indices, intersection point locations and local surface normals
+    #  Note: the volumes are identified by their index in the volume list so that all the elimination checks
+    #        below are numeric operations on contiguous arrays; the arrays of all volumes are concatenated
+    #        once after the loop.
+    volumeNames             = list(volumeList.keys())
+    intersectVolumeIndices  = [np.empty((0,), dtype=np.int32)]
+    intersectLocations      = [np.empty((0, 3))]
+    intersectNormals        = [np.empty((0, 3))]
+    
+    #= loop over all the created volumes in the geometry
+    for volumeIndex, vol in enumerate(volumeList.values()):
+        #= skip the volume if the photon misses its bounding box
+        if not rayHitsVolumeBounds(vol, opPosition, opMomentumDir)[0]: continue
         #= intersect with the current volume
-        intersect_locs, _, intersect_tris = volumeList[opVolume].volumeTrimesh.ray.intersects_location(ray_origins    = opPosition,
-                                                                                                       ray_directions = opMomentumDir)
-        # this check is unnecessary but put here as a fail safe
-        if len(intersect_locs) == 0:
-            nextVolume               = None
-            volumeIntersectPoint     = None
-            intersectPlaneNormal     = None
-        else:
-            distances              = np.round(np.linalg.norm(opPosition[0]-np.round(np.vstack(intersect_locs), 9), axis = 1), 9)
-            farthestIntersectIndex = np.argmax(distances)
-            volumeIntersectPoint   = np.round(np.array([intersect_locs[farthestIntersectIndex]]), 9)
-            intersectPlaneNormal   = np.array([volumeList[opVolume].volumeTrimesh.face_normals[intersect_tris[farthestIntersectIndex]]])
-            nextVolume             = volumeList[opVolume].touchingVolumes[tuple(intersectPlaneNormal[0])]
-            #= reverse the normal to point towards the photon's incidence volume
-            intersectPlaneNormal   *= -1
+        intersect_locs, _, intersect_tris = intersectVolumeTriangles(vol, opPosition, opMomentumDir)
+        intersect_triFaceNormals = np.array(vol.volumeTrimesh.face_normals[intersect_tris])
         
-    #### == the photon is at the outside 'environment' or between the reflector and a geometry volume
-    else:
-        #= create a record array to record the intersections info with all volumes
-        volumeIntersectsInfo = np.empty((0,), dtype=[('volume', object), ('intersect_loc', np.ndarray), ('intersect_normal', np.ndarray)])
+        #  Note: the photon origin point isn't among the intersections even if it is exactly on a volume trimesh
+        #        boundary, e.g. a transmitted photon to the outside environment or a photon reflected by the
+        #        reflector, since intersectVolumeTriangles() eliminates it.
         
-        #= loop over all the created volumes in the geometry
-        for key, vol in volumeList.items():
-            #= intersect with the current volume
-            intersect_locs, _, intersect_tris = vol.volumeTrimesh.ray.intersects_location(ray_origins = opPosition,
-                                                                                          ray_directions = opMomentumDir)
-            intersect_triFaceNormals = np.array(vol.volumeTrimesh.face_normals[intersect_tris])
-            
-            # # this next elimination check is not necessary when using the pyembree accelerator
-            # #= eliminating the photon origin point that is considered an intersection point if it is exactly
-            # #  on a volume trimesh boundary.
-            # #  Note: this is NOT redundant to the previous check. A transmitted photon to the outside environment
-            # #        with an origin exactly on the boundary of a volume won't be detected by the previous check
-            # #        since the photon's associated volume is not that volume and rather the outside environment
-            # trueIntersectIndices = []
-            # for l, loc in enumerate(intersect_locs):
-            #     if not np.array_equal(loc, opPosition[0]): trueIntersectIndices.append(l)
-            # intersect_locs = intersect_locs[trueIntersectIndices]
-            # intersect_tris = intersect_tris[trueIntersectIndices]
-            # intersect_triFaceNormals = np.array(vol.volumeTrimesh.face_normals[intersect_tris])
+        #= eliminating the replica intersections, e.g. the replica second intersection that trimesh sometimes produce
+        #  when intersecting the 'environment' or 'reflector' volumes (a bug of unknown reason!) or the hits of a ray
+        #  passing through an edge or a corner of a volume
+        #  Note: the intersections are deduplicated by their locations quantized to 1E-6 um, keeping the first
+        #        intersection of each location in order.
+        if len(intersect_locs) > 1:
+            _, uniqueIndices = np.unique(np.round(intersect_locs*1E6).astype(np.int64), axis=0, return_index=True)
+            uniqueIndices            = np.sort(uniqueIndices)
+            intersect_locs           = intersect_locs[uniqueIndices]
+            intersect_triFaceNormals = intersect_triFaceNormals[uniqueIndices]
+
+        #= do NOT record if no volume intersections
+        if len(intersect_locs) == 0: continue
+        #= record all intersection point locations and local surface normals
+        intersectVolumeIndices.append(np.full(len(intersect_locs), volumeIndex, dtype=np.int32))
+        intersectLocations.append(np.round(intersect_locs, 9))
+        intersectNormals.append(intersect_triFaceNormals)
+    intersectVolumeIndices = np.concatenate(intersectVolumeIndices)
+    intersectLocations     = np.concatenate(intersectLocations)
+    intersectNormals       = np.concatenate(intersectNormals)
+   
+    # == if only one intersection, it must be with the outside 'environment' volume
+    if len(intersectVolumeIndices) == 1:
+        nextVolume               = None
+        volumeIntersectPoint     = None
+        intersectPlaneNormal     = None
+    else:
+        # this replaces the next two checks on line 119 & 131
+        #= eliminating multiple closestIntersectIndex in case of touching volumes, eg. pillar-OG or reflector-PD;
+        # otherwise, two closest intersection will be detected in the next elimination check.
+        #  Note: the squared distances between the photon origin and all intersections are estimated once. The
+        #        following checks only eliminate the indices of the remaining intersections, and the intersection
+        #        locations and normals are sliced once from their arrays for the final intersection.
+        intersectDifferences  = intersectLocations - opPosition[0]
+        squaredDistances      = np.einsum('ij,ij->i', intersectDifferences, intersectDifferences)
+        remainingIntersects   = np.arange(len(intersectVolumeIndices))
+        closestIntersectIndex = getClosestIntersectIndices(squaredDistances)
+        # several closest intersections means the photon is spacially inside a volume that is touching another despite it is supposed to be outside!
+        if len(closestIntersectIndex) > 1:
+            touchingVolumeIndices = [volumeNames.index(name) for name in ('pillar', 'reflector') if name in volumeList]
+            remainingIntersects   = remainingIntersects[~np.isin(intersectVolumeIndices, touchingVolumeIndices)]
             
-            #= eliminating the replica second intersection that trimesh sometimes produce when intersecting
-            #  the 'environment' or 'reflector' volumes. It's a bug of unknown reason!
-            if (vol.name == 'environment' or vol.name == 'reflector') and len(intersect_locs) > 1:
-                if np.isclose(intersect_locs, intersect_locs[0]).all():
-                    intersect_locs = np.array([intersect_locs[0]])
-                    intersect_triFaceNormals = np.array([intersect_triFaceNormals[0]])
-
-            #= do NOT record if no volume intersections
-            if len(intersect_locs) == 0: continue
-            #= record all intersection point locations and local surface normals
-            for i in range(len(intersect_locs)):
-                volumeIntersectsInfo = np.append(volumeIntersectsInfo, np.array((vol.name,
-                                                                                 np.round(np.array([intersect_locs[i]]), 9),
-                                                                                 np.array([intersect_triFaceNormals[i]])),
-                                                                                 dtype = volumeIntersectsInfo.dtype))
-       
-        # == if only one intersection, it must be with the outside 'environment' volume
-        if len(volumeIntersectsInfo) == 1:
+        # #= eliminating the intersection with the pillar volume at its boundary with a touching volume
+        # #  if the photon had transmitted to the outside 'environment' but under the pillar average
+        # #  surface and headed towards that boundary; otherwise, two closest intersection will be
+        # #  detected in the next elimination check.
+        # pillarIntersectIndex = np.where(volumeIntersectsInfo['volume'] == 'pillar')[0]
+        # if len(pillarIntersectIndex) != 0:
+        #     distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
+        #     closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
+        #     # several closest intersections means the photon is spacially inside a volume that is touching another despite it is supposed to be outside!
+        #     if len(closestIntersectIndex) > 1:
+        #         volumeIntersectsInfo = np.delete(volumeIntersectsInfo, pillarIntersectIndex)
+                
+        # #= eliminating the intersection with the reflector volume at its boundary with a touching volume
+        # #  if the photon is in the air gap and headed towards that boundary; otherwise, two closest 
+        # #  intersection will be detected in the next elimination check.
+        # reflectorIntersectIndex = np.where(volumeIntersectsInfo['volume'] == 'reflector')[0]
+        # if len(reflectorIntersectIndex) != 0:
+        #     distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
+        #     closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
+        #     # several closest intersections means the photon is headed towards a touching volume with the reflector
+        #     if len(closestIntersectIndex) > 1:
+        #         volumeIntersectsInfo = np.delete(volumeIntersectsInfo, reflectorIntersectIndex)
+                
+        #= eliminating the intersection with a volume other than the photon's current associated volume
+        #  if it is slightly inside it.
+        #  This happens when the origin of a photon that is associated with the outside 'environment' or 'reflector'
+        #  is slightly above the irregular surface trimesh of another volume (which means it is spacially in that 
+        #  other volume) and that trimesh.ray.intersects_location() would undesirably detect and intersect the
+        #  neighbouring volume.
+        closestIntersectIndex = remainingIntersects[getClosestIntersectIndices(squaredDistances[remainingIntersects])]
+        # check if that one intersection is not with the outside 'environment' or 'refelctor' volumes
+        if intersectVolumeIndices[closestIntersectIndex] != volumeNames.index(opVolume):
+            # check if there is only one intersection with that volume and only then eliminate it; otherwise, two intersections means
+            # that the photon is headed towards another volume from its outside and therfore both intersections should be kept.
+            if np.count_nonzero(intersectVolumeIndices[remainingIntersects] == intersectVolumeIndices[closestIntersectIndex]) == 1:
+                # eliminate it
+                remainingIntersects = remainingIntersects[remainingIntersects != closestIntersectIndex]
+        
+        # == if only one intersection, it must be with the outside 'environment' volume        
+        if len(remainingIntersects) == 1: 
             nextVolume               = None
             volumeIntersectPoint     = None
             intersectPlaneNormal     = None
         else:
-            # this replaces the next two checks on line 119 & 131
-            #= eliminating multiple closestIntersectIndex in case of touching volumes, eg. pillar-OG or reflector-PD;
-            # otherwise, two closest intersection will be detected in the next elimination check.
-            distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
-            closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
-            # several closest intersections means the photon is spacially inside a volume that is touching another despite it is supposed to be outside!
-            if len(closestIntersectIndex) > 1:
-                touchingIndices = np.where( (volumeIntersectsInfo['volume'] == 'pillar') | (volumeIntersectsInfo['volume'] == 'reflector'))[0]
-                volumeIntersectsInfo = np.delete(volumeIntersectsInfo, touchingIndices)
-                
-            # #= eliminating the intersection with the pillar volume at its boundary with a touching volume
-            # #  if the photon had transmitted to the outside 'environment' but under the pillar average
-            # #  surface and headed towards that boundary; otherwise, two closest intersection will be
-            # #  detected in the next elimination check.
-            # pillarIntersectIndex = np.where(volumeIntersectsInfo['volume'] == 'pillar')[0]
-            # if len(pillarIntersectIndex) != 0:
-            #     distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
-            #     closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
-            #     # several closest intersections means the photon is spacially inside a volume that is touching another despite it is supposed to be outside!
-            #     if len(closestIntersectIndex) > 1:
-            #         volumeIntersectsInfo = np.delete(volumeIntersectsInfo, pillarIntersectIndex)
-                    
-            # #= eliminating the intersection with the reflector volume at its boundary with a touching volume
-            # #  if the photon is in the air gap and headed towards that boundary; otherwise, two closest 
-            # #  intersection will be detected in the next elimination check.
-            # reflectorIntersectIndex = np.where(volumeIntersectsInfo['volume'] == 'reflector')[0]
-            # if len(reflectorIntersectIndex) != 0:
-            #     distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
-            #     closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
-            #     # several closest intersections means the photon is headed towards a touching volume with the reflector
-            #     if len(closestIntersectIndex) > 1:
-            #         volumeIntersectsInfo = np.delete(volumeIntersectsInfo, reflectorIntersectIndex)
-                    
-            #= eliminating the intersection with a volume other than the photon's current associated volume
-            #  if it is slightly inside it.
-            #  This happens when the origin of a photon that is associated with the outside 'environment' or 'reflector'
-            #  is slightly above the irregular surface trimesh of another volume (which means it is spacially in that 
-            #  other volume) and that trimesh.ray.intersects_location() would undesirably detect and intersect the
-            #  neighbouring volume.
-            distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
-            closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
-            # check if that one intersection is not with the outside 'environment' or 'refelctor' volumes
-            if volumeIntersectsInfo['volume'][closestIntersectIndex] != opVolume:
-                # check if there is only one intersection with that volume and only then eliminate it; otherwise, two intersections means
-                # that the photon is headed towards another volume from its outside and therfore both intersections should be kept.
-                if len(np.where(volumeIntersectsInfo['volume'] == volumeIntersectsInfo['volume'][closestIntersectIndex])[0]) == 1:
-                    # eliminate it
-                    volumeIntersectsInfo = np.delete(volumeIntersectsInfo, closestIntersectIndex)
-            
-            # == if only one intersection, it must be with the outside 'environment' volume        
-            if len(volumeIntersectsInfo) == 1: 
-                nextVolume               = None
-                volumeIntersectPoint     = None
-                intersectPlaneNormal     = None
-            else:
-                #= estimate the distance between the photon origin and all intersections
-                distances = np.round(np.linalg.norm(opPosition-np.vstack(volumeIntersectsInfo['intersect_loc']), axis = 1), 9)
-                #= find the shortest distances
-                closestIntersectIndex = np.where(distances == distances[np.argmin(distances)])[0]
-                #= eliminate the others
-                volumeIntersectsInfo = volumeIntersectsInfo[closestIntersectIndex]
-                #
-                nextVolume               = volumeIntersectsInfo['volume'][0]
-                volumeIntersectPoint     = volumeIntersectsInfo['intersect_loc'][0]
-                intersectPlaneNormal     = volumeIntersectsInfo['intersect_normal'][0]
-                if nextVolume == opVolume:
-                    intersectPlaneNormal    *= -1
+            #= find the shortest distances and eliminate the others
+            closestIntersectIndex = remainingIntersects[getClosestIntersectIndices(squaredDistances[remainingIntersects])[:1]]
+            #
+            nextVolume               = volumeNames[intersectVolumeIndices[closestIntersectIndex[0]]]
+            volumeIntersectPoint     = intersectLocations[closestIntersectIndex]
+            intersectPlaneNormal     = intersectNormals[closestIntersectIndex]
+            if nextVolume == opVolume:
+                intersectPlaneNormal    *= -1
     
     return volumeIntersectPoint, intersectPlaneNormal, nextVolume
 
 
 
-def sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal):
+#= specialized volume intersection function of each photon associated volume that isn't intersected as an inside one
+VOLUME_INTERSECTION_FUNCTIONS = {'environment': getVolumeTrimeshIntersectionOutside,
+                                 'reflector':   getVolumeTrimeshIntersectionOutside
+                                 }
+
+
+
+def getVolumeTrimeshIntersection(volumeList, opPosition, opMomentumDir, opVolume):
     '''
-    sampling an initial point on a surface trimesh in its frame of reference
+    intersecting geometry volumes to find the first intersection point, plane, and next volume
+
+    Parameters
+    ----------
+    volumeList    : dict of volume objects
+                    All Geometry volume objects.
+    opPosition    : (1x3) array of floats
+                    Photon's origin position in um.
+    opMomentumDir : (1x3) array of floats
+                    Photon's momentum direction unit vector.
+    opVolume      : string
+                    Photon's current associated volume.
+
+    Returns
+    -------
+    volumeIntersectPoint : (1x3) array of floats
+                           Initial intersection point on a volume in um.
+    intersectPlaneNormal : (1x3) array of floats
+                           Normal unit vector of the intersected plane.
+    nextVolume           : string
+                           Next volume to the intersected plane.
+
+    '''
+    
+    #= dispatch to the specialized function of the photon's associated volume
+    #  Note: callers that already know the photon's case could call the specialized functions directly.
+    return VOLUME_INTERSECTION_FUNCTIONS.get(opVolume, getVolumeTrimeshIntersectionInside)(volumeList, opPosition, opMomentumDir, opVolume)
+
+
+
+def getVolumeTrimeshIntersectionBatch(volumeList, opPositions, opMomentumDirs, opVolume):
+    '''
+    intersecting geometry volumes for a cohort of photons sharing the same associated volume
+
+    Parameters
+    ----------
+    volumeList     : dict of volume objects
+                     All Geometry volume objects.
+    opPositions    : (Mx3) array of floats
+                     Photons' origin positions in um.
+    opMomentumDirs : (Mx3) array of floats
+                     Photons' momentum direction unit vectors.
+    opVolume       : string
+                     Photons' current associated volume.
+
+    Returns
+    -------
+    volumeIntersectPoints : (Mx3) array of floats
+                            Initial intersection points on a volume in um, NaN for photons without intersections.
+    intersectPlaneNormals : (Mx3) array of floats
+                            Normal unit vectors of the intersected planes, NaN for photons without intersections.
+    nextVolumes           : list of strings
+                            Next volume to each intersected plane, None for photons without intersections.
+
+    '''
+
+    opPositions    = np.ascontiguousarray(opPositions, dtype=np.float64).reshape(-1, 3)
+    opMomentumDirs = np.ascontiguousarray(opMomentumDirs, dtype=np.float64).reshape(-1, 3)
+    numberOfRays   = len(opPositions)
+
+    volumeIntersectPoints = np.full((numberOfRays, 3), np.nan)
+    intersectPlaneNormals = np.full((numberOfRays, 3), np.nan)
+    nextVolumes           = [None]*numberOfRays
+
+    #### == the photons are at the outside 'environment' or between the reflector and a geometry volume
+    #  Note: the elimination checks of this case depend on all intersections of a single ray with all volumes and
+    #        are therefore done per photon.
+    if opVolume == 'environment' or opVolume == 'reflector':
+        for r in range(numberOfRays):
+            volumeIntersectPoint, intersectPlaneNormal, nextVolume = getVolumeTrimeshIntersectionOutside(volumeList,
+                                                                                                         opPositions[r:r+1],
+                                                                                                         opMomentumDirs[r:r+1],
+                                                                                                         opVolume)
+            if nextVolume is None: continue
+            volumeIntersectPoints[r] = volumeIntersectPoint[0]
+            intersectPlaneNormals[r] = intersectPlaneNormal[0]
+            nextVolumes[r]           = nextVolume
+        return volumeIntersectPoints, intersectPlaneNormals, nextVolumes
+
+    #### == the photons are inside any of the geometry volumes
+    #= find the exit points of all rays from the current volume, i.e. their farthest intersections, in a single call
+    exitPoints, exitNormals, hits = intersectVolumeBoundsExit(volumeList[opVolume], opPositions, opMomentumDirs)
+
+    rays = np.nonzero(hits)[0]
+    volumeIntersectPoints[rays] = np.round(exitPoints[rays], 9)
+    intersectPlaneNormals[rays] = exitNormals[rays]
+    for r in rays:
+        nextVolumes[r] = volumeList[opVolume].touchingVolumes[volume.encodeNormal(intersectPlaneNormals[r])]
+    #= reverse the normals to point towards the photons' incidence volume
+    intersectPlaneNormals[rays] *= -1
+
+    return volumeIntersectPoints, intersectPlaneNormals, nextVolumes
+
+
+
+def sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal, numberOfPoints=1):
+    '''
+    sampling initial points on a surface trimesh in its frame of reference
 
     Parameters
     ----------
@@ -198,11 +669,14 @@ def sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal):
     volumeIntersectPlaneNormal : (1x3) array of floats
                                  Normal unit vector of the intersected plane of the volume.
                                  For cuboid-shaped volumes, the two lateral coordinates will have 0.0 values.
+    numberOfPoints             : int, optional
+                                 Number of points to sample.
+                                 The default is 1.
 
     Returns
     -------
-    trimeshSampledPoint        : (1x3) array of floats
-                                 Initial sampled point on the surface mesh in its frame of reference in um.
+    trimeshSampledPoint        : (Nx3) array of floats
+                                 Initial sampled points on the surface mesh in its frame of reference in um.
 
     '''
     
@@ -214,65 +688,64 @@ def sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal):
     #    Leave out an arbitrary 5%
     
     #= get the lateral coordinates indices
-    lateralCoordIndices = np.where(volumeIntersectPlaneNormal[0, :] == 0.0)[0]
+    lateralCoordIndices = AXIS_INDICES[volume.encodeNormal(volumeIntersectPlaneNormal[0])]
     
-    #= sample the two lateral coordinates within the limitied area
-    ax1_point  = np.random.uniform(samplingBounds[0, lateralCoordIndices[0]], samplingBounds[1, lateralCoordIndices[0]])
-    ax2_point  = np.random.uniform(samplingBounds[0, lateralCoordIndices[1]], samplingBounds[1, lateralCoordIndices[1]])
+    #= sample the two lateral coordinates of all points within the limitied area from a single draw of uniforms
+    u          = RNG.random((numberOfPoints, 2))
+    ax1_point  = samplingBounds[0, lateralCoordIndices[0]] + u[:, 0]*(samplingBounds[1, lateralCoordIndices[0]] - samplingBounds[0, lateralCoordIndices[0]])
+    ax2_point  = samplingBounds[0, lateralCoordIndices[1]] + u[:, 1]*(samplingBounds[1, lateralCoordIndices[1]] - samplingBounds[0, lateralCoordIndices[1]])
     #
-    trimeshSampledPoint = np.zeros([1, 3])
-    trimeshSampledPoint[0, lateralCoordIndices[0]] = ax1_point
-    trimeshSampledPoint[0, lateralCoordIndices[1]] = ax2_point
+    trimeshSampledPoint = np.zeros([numberOfPoints, 3])
+    trimeshSampledPoint[:, lateralCoordIndices[0]] = ax1_point
+    trimeshSampledPoint[:, lateralCoordIndices[1]] = ax2_point
     
     return trimeshSampledPoint
 
 
 
-def shiftSurfaceTrimesh(surfaceTrimesh, volumeIntersectPlaneNormal, volumeIntersectPoint, trimeshSampledPoint):
+def shiftSurfaceTrimesh(volumeIntersectPlaneNormal, volumeIntersectPoint, trimeshSampledPoint):
     '''
-    shifting the surface trimesh such that the two lateral coordinates of the sampled mesh point match
-    the two of the volume intersection point
+    calculating the shifts of the surface trimesh such that the two lateral coordinates of each sampled mesh point
+    match the two of the volume intersection point
+    
+    Note: the surface trimesh itself is not shifted. Shifting the trimesh by the shift vector is equivalent to
+          shifting the photon origin by its negative, which is done when intersecting the trimesh so that all
+          photons share the same trimesh and its ray accelerator without copying it.
 
     Parameters
     ----------
-    surfaceTrimesh             : trimesh object
-                                 Surface trimesh to be shifted.
     volumeIntersectPlaneNormal : (1x3) array of floats
                                  Normal unit vector of the intersected plane of the volume.
                                  For cuboid-shaped volumes, the two lateral coordinates will have 0.0 values.
     volumeIntersectPoint       : (1x3) array of floats
                                  Initial intersection point in the volume frame of reference in um.
-    trimeshSampledPoint        : (1x3) array of floats
-                                 Initial sampled point on the surface mesh in its frame of reference in um.
+    trimeshSampledPoint        : (Nx3) array of floats
+                                 Initial sampled points on the surface mesh in its frame of reference in um.
 
     Returns
     -------
-    surfaceTrimesh             : trimesh object
-                                 Shifted surface trimesh that is ready to perform the intersecting.
+    shiftVector                : (Nx3) array of floats
+                                 Shifts from the surface trimesh frame of reference to the volume one in um.
 
     '''
     
     #= get the lateral and vertical coordinates indices
-    lateralCoordIndices = np.where(volumeIntersectPlaneNormal[0, :] == 0.0)[0]
-    verticalCoordIndex  = np.where(np.abs(volumeIntersectPlaneNormal[0, :]) == 1.0)[0]
+    *lateralCoordIndices, verticalCoordIndex = AXIS_INDICES[volume.encodeNormal(volumeIntersectPlaneNormal[0])]
     
     #= calculate the shift values for each coordinate
-    ax1_shift  = volumeIntersectPoint[0, lateralCoordIndices[0]] - trimeshSampledPoint[0, lateralCoordIndices[0]]
-    ax2_shift  = volumeIntersectPoint[0, lateralCoordIndices[1]] - trimeshSampledPoint[0, lateralCoordIndices[1]]
+    ax1_shift  = volumeIntersectPoint[0, lateralCoordIndices[0]] - trimeshSampledPoint[:, lateralCoordIndices[0]]
+    ax2_shift  = volumeIntersectPoint[0, lateralCoordIndices[1]] - trimeshSampledPoint[:, lateralCoordIndices[1]]
     #
-    shiftVector = np.zeros(3)
-    shiftVector[lateralCoordIndices[0]] = ax1_shift
-    shiftVector[lateralCoordIndices[1]] = ax2_shift
-    shiftVector[verticalCoordIndex]     = volumeIntersectPoint[0, verticalCoordIndex]
-   
-    #= shift the surface mesh
-    surfaceTrimesh = surfaceTrimesh.apply_translation(shiftVector)
+    shiftVector = np.zeros([len(trimeshSampledPoint), 3])
+    shiftVector[:, lateralCoordIndices[0]] = ax1_shift
+    shiftVector[:, lateralCoordIndices[1]] = ax2_shift
+    shiftVector[:, verticalCoordIndex]     = volumeIntersectPoint[0, verticalCoordIndex]
     
-    return surfaceTrimesh
+    return shiftVector
 
 
 
-def getSurfaceTrimeshIntersection(surfaceTrimesh, opPosition, opMomentumDir):
+def getSurfaceTrimeshIntersection(surfaceTrimesh, opPosition, opMomentumDir, shiftVector=None):
     '''
     finding the intersection with the trimesh
 
@@ -284,6 +757,9 @@ def getSurfaceTrimeshIntersection(surfaceTrimesh, opPosition, opMomentumDir):
                                 Photon's origin position in um.
     opMomentumDir             : (1x3) array of floats
                                 Photon's momentum direction unit vector.
+    shiftVector               : (3,) array of floats, optional
+                                Shift of the surface trimesh to the volume frame of reference in um.
+                                The default is None, i.e. no shift.
 
     Returns
     -------
@@ -294,28 +770,88 @@ def getSurfaceTrimeshIntersection(surfaceTrimesh, opPosition, opMomentumDir):
 
     '''
     
-    #= intersect with the trimesh
+    if shiftVector is None: shiftVector = np.zeros(3)
+    
+    #= intersect with the trimesh in its own frame of reference, i.e. with the photon origin shifted back
+    opPosition = opPosition - shiftVector
     trimeshIntersecPoints, _, trimeshIntersecTriangles = surfaceTrimesh.ray.intersects_location(ray_origins = opPosition,
                                                                                                 ray_directions = opMomentumDir)
     
     if len(trimeshIntersecPoints) == 0: return np.array([]), np.array([])
     
     #= eliminating the photon origin point that is considered as an intersection point if it is exactly on a surface trimesh
-    distances = np.round(np.linalg.norm(opPosition-trimeshIntersecPoints, axis = 1), 9)
-    # true intersections will have distances > 0.0; use a slightly higher number instead becasue of the machine precision
-    trueIntersecPointsIndices = np.where(distances > 1E-9)[0]
-    trimeshIntersecPoints     = trimeshIntersecPoints[trueIntersecPointsIndices]
-    trimeshIntersecTriangles  = trimeshIntersecTriangles[trueIntersecPointsIndices]
-    distances                 = distances[trueIntersecPointsIndices]
-    if len(distances) == 0: return np.array([]), np.array([])
+    intersecDifferences = trimeshIntersecPoints - opPosition
+    squaredDistances    = np.einsum('ij,ij->i', intersecDifferences, intersecDifferences)
+    # true intersections will have distances > 0.0; use the distance tolerance instead becasue of the machine precision
+    #  Note: the other intersections are masked with infinite distances so that the first one is found in a single pass.
+    squaredDistances          = np.where(squaredDistances > DISTANCE_TOLERANCE**2, squaredDistances, np.inf)
+    firstIntersecIndex        = squaredDistances.argmin()
+    if squaredDistances[firstIntersecIndex] == np.inf: return np.array([]), np.array([])
     #= get the first intersection
-    trimeshIntersecPoint      = np.array([trimeshIntersecPoints[np.argmin(distances)]])
-    trimeshIntersecTriangle   = np.array([trimeshIntersecTriangles[np.argmin(distances)]])
+    trimeshIntersecPoint      = trimeshIntersecPoints[firstIntersecIndex:firstIntersecIndex+1]
         
     #= find the face normal
-    trimeshIntersecFaceNormal = np.array(surfaceTrimesh.face_normals[trimeshIntersecTriangle])
+    #  Note: the face normals are invariant under the shift.
+    trimeshIntersecFaceNormal = surfaceTrimesh.face_normals[trimeshIntersecTriangles[firstIntersecIndex:firstIntersecIndex+1]]
+    
+    return trimeshIntersecPoint + shiftVector, trimeshIntersecFaceNormal
+
+
+
+def getSurfaceTrimeshIntersectionBatch(surfaceTrimesh, opPosition, opMomentumDir, shiftVectors):
+    '''
+    finding the intersections of a photon with the trimesh for several candidate shifts of the trimesh in a single
+    multi-ray intersection call
+
+    Parameters
+    ----------
+    surfaceTrimesh             : trimesh object
+                                 Surface trimesh to be intersected.
+    opPosition                 : (1x3) array of floats
+                                 Photon's origin position in um.
+    opMomentumDir              : (1x3) array of floats
+                                 Photon's momentum direction unit vector.
+    shiftVectors               : (Nx3) array of floats
+                                 Candidate shifts of the surface trimesh to the volume frame of reference in um.
+
+    Returns
+    -------
+    trimeshIntersecPoints      : (Nx3) array of floats
+                                 Intersection point with the trimesh in um for each shift, NaN for shifts without intersections.
+    trimeshIntersecFaceNormals : (Nx3) array of floats
+                                 Normal unit vector of the intersected face for each shift, NaN for shifts without intersections.
+
+    '''
+    
+    #= intersect with the trimesh in its own frame of reference, i.e. with the photon origin shifted back by each shift
+    rayOrigins    = opPosition[0] - shiftVectors
+    rayDirections = np.repeat(opMomentumDir, len(shiftVectors), axis=0)
+    intersecPoints, intersecRays, intersecTriangles = surfaceTrimesh.ray.intersects_location(ray_origins = rayOrigins,
+                                                                                             ray_directions = rayDirections)
+    
+    trimeshIntersecPoints      = np.full((len(shiftVectors), 3), np.nan)
+    trimeshIntersecFaceNormals = np.full((len(shiftVectors), 3), np.nan)
+    
+    #= eliminating the photon origin points that are considered as intersection points if exactly on the surface trimesh
+    intersecDifferences = intersecPoints - rayOrigins[intersecRays]
+    squaredDistances    = np.einsum('ij,ij->i', intersecDifferences, intersecDifferences)
+    trueIntersecs       = squaredDistances > DISTANCE_TOLERANCE**2
+    if not trueIntersecs.any(): return trimeshIntersecPoints, trimeshIntersecFaceNormals
+    intersecPoints, intersecRays, intersecTriangles, squaredDistances = intersecPoints[trueIntersecs], intersecRays[trueIntersecs],\
+                                                                        intersecTriangles[trueIntersecs], squaredDistances[trueIntersecs]
+    
+    #= get the first intersection of each ray by sorting on the ray index then the distance, and picking the first
+    #  intersection of each ray group
+    order       = np.lexsort((squaredDistances, intersecRays))
+    sortedRays  = intersecRays[order]
+    firstOfRay  = np.insert(sortedRays[1:] != sortedRays[:-1], 0, True)
+    first       = order[firstOfRay]
+    
+    rays = intersecRays[first]
+    trimeshIntersecPoints[rays]      = intersecPoints[first] + shiftVectors[rays]
+    trimeshIntersecFaceNormals[rays] = surfaceTrimesh.face_normals[intersecTriangles[first]]
     
-    return trimeshIntersecPoint, trimeshIntersecFaceNormal
+    return trimeshIntersecPoints, trimeshIntersecFaceNormals
 
 
 
@@ -339,7 +875,9 @@ def prepareSurfaceTrimesh(opPosition, opMomentumDir, opVolume, volumeIntersectPo
     Returns
     -------
     surfaceTrimesh             : trimesh object
-                                 Surface trimesh to be shifted.
+                                 Surface trimesh to be intersected.
+    shiftVector                : (3,) array of floats
+                                 Shift of the surface trimesh to the volume frame of reference in um.
     trimeshIntersectPoint      : (1x3) array of floats
                                  Intersection point with the trimesh in um.
     trimeshIntersectFaceNormal : (1x3) array of floats
@@ -347,10 +885,6 @@ def prepareSurfaceTrimesh(opPosition, opMomentumDir, opVolume, volumeIntersectPo
 
     '''
 
-    # counter of times the photon position happen to fall under the surface trimesh it's supposed to hit
-    # This would happen if the photon is at a corner and reflecting off a surface to the adjacent one within
-    # the scale of the surface trimesh features.
-    originUnderSurfaceMeshCounter = 0
     #= retrieve the bounds on the surface trimesh marking the allowed area to sample a potential intersection point
     #  from within
     #  Note: The bounds are set to leave 5% on the area periphery to ensure that the photon doesn't run out of surface
@@ -358,34 +892,40 @@ def prepareSurfaceTrimesh(opPosition, opMomentumDir, opVolume, volumeIntersectPo
     #        The 5% is arbitray. Limiting the area allowed to sample the intersection point within is fine ONLY if the
     #        modeled area has several repetitions of features, if any; otherwise, the parts of the features would be
     #        cut out and therefore the modeled surface trimesh won't be a good representation of the actual surface.
-    samplingBounds      = opVolume.surfaceTrimeshes[tuple(map(tuple,volumeIntersectPlaneNormal))[0]].samplingBounds # um
-    #= keep sampling a surface trimesh point until a viable configuration is found where the photon position
-    #  happens to be above the surface trimesh it is supposed to hit, or up to 20 times (arbitrary) if no viable
-    #  point is sampled
-    #  Note: if no viable point is found, this loosly represents photon trapping at a corner and is therefore killed.
-    while True:
-        #= get a sampled point on the surface trimesh that marks a potential intersection point as the photon is set to
-        #  head towards it
-        trimeshSampledPoint = sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal)                                                  # um
-        #= retrieve the surface trimesh to intersect from the volume that has it and acquired volume intersection plane
-        surfaceTrimesh      = copy.deepcopy(opVolume.surfaceTrimeshes[tuple(map(tuple,volumeIntersectPlaneNormal))[0]].trimesh)
-        #= shift the entire surface trimesh such that the sampled point coincides with the previously acquired tentative
-        #  volume intersection point
-        #  Note: This simplifies tracking as it unifies the volume and surface trimeshes frame of references
-        surfaceTrimesh      = shiftSurfaceTrimesh(surfaceTrimesh, volumeIntersectPlaneNormal, volumeIntersectPoint, trimeshSampledPoint)
-        #= get the true intersection point with the surface trimesh and local normal
-        trimeshIntersectPoint, trimeshIntersectFaceNormal = getSurfaceTrimeshIntersection(surfaceTrimesh, opPosition, opMomentumDir)     # um
-        #= resample for up to 20 times (arbitrary) then kill if no true intersection
-        if len(trimeshIntersectPoint) == 0:
-            if originUnderSurfaceMeshCounter < 20:
-                originUnderSurfaceMeshCounter += 1
-                continue
-            else:
-                break
+    intersectedSurface  = opVolume.surfaceTrimeshes[volume.encodeNormal(volumeIntersectPlaneNormal[0])]
+    samplingBounds      = intersectedSurface.samplingBounds # um
+    #= retrieve the surface trimesh to intersect from the volume that has it and acquired volume intersection plane
+    surfaceTrimesh      = intersectedSurface.trimesh
+    #= get a sampled point on the surface trimesh that marks a potential intersection point as the photon is set to
+    #  head towards it
+    trimeshSampledPoint = sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal)                                                  # um
+    #= get the shift of the entire surface trimesh such that the sampled point coincides with the previously
+    #  acquired tentative volume intersection point
+    #  Note: This simplifies tracking as it unifies the volume and surface trimeshes frame of references
+    shiftVector         = shiftSurfaceTrimesh(volumeIntersectPlaneNormal, volumeIntersectPoint, trimeshSampledPoint)[0]
+    #= get the true intersection point with the surface trimesh and local normal
+    trimeshIntersectPoint, trimeshIntersectFaceNormal = getSurfaceTrimeshIntersection(surfaceTrimesh, opPosition, opMomentumDir, shiftVector)     # um
+    
+    #= if the photon position happens to fall under the surface trimesh it's supposed to hit, resample up to 20 (arbitrary)
+    #  other points at once and intersect them all in a single call to take the first viable configuration where the
+    #  photon position is above the surface trimesh
+    #  Note: This would happen if the photon is at a corner and reflecting off a surface to the adjacent one within
+    #        the scale of the surface trimesh features. If no viable point is found, this loosly represents photon
+    #        trapping at a corner and is therefore killed.
+    #        The first point is intersected alone since it is viable for most photons and intersecting more rays costs more.
+    if len(trimeshIntersectPoint) == 0:
+        trimeshSampledPoints = sampleSurfaceTrimeshPoint(samplingBounds, volumeIntersectPlaneNormal, numberOfPoints=20)                        # um
+        shiftVectors         = shiftSurfaceTrimesh(volumeIntersectPlaneNormal, volumeIntersectPoint, trimeshSampledPoints)
+        trimeshIntersectPoints, trimeshIntersectFaceNormals = getSurfaceTrimeshIntersectionBatch(surfaceTrimesh, opPosition, opMomentumDir, shiftVectors)   # um
+        viableIndices        = np.where(~np.isnan(trimeshIntersectPoints[:, 0]))[0]
+        if len(viableIndices) == 0:
+            shiftVector = shiftVectors[-1]
         else:
-            break
+            shiftVector                = shiftVectors[viableIndices[0]]
+            trimeshIntersectPoint      = trimeshIntersectPoints[viableIndices[:1]]
+            trimeshIntersectFaceNormal = trimeshIntersectFaceNormals[viableIndices[:1]]
         
-    return surfaceTrimesh, trimeshIntersectPoint, trimeshIntersectFaceNormal
+    return surfaceTrimesh, shiftVector, trimeshIntersectPoint, trimeshIntersectFaceNormal
 
 
 
@@ -422,103 +962,22 @@ def calculateCosineIncidenceAngle(opMomentumDir, intersectNormal):
 
 
 
-def calculateSineTransmissionAngle(cosIncidenceAngle, currentVolumeRIndex, nextVolumeRIndex):
-    '''
-    calculating a photon's transmission angle cosine
-
-    Parameters
-    ----------
-    cosIncidenceAngle   : float
-                          Cosine of the incidence angle.
-    currentVolumeRIndex : float
-                          Index of refraction of the incidence volume.
-    nextVolumeRIndex    : float
-                          Index of refraction of the transmission volume.
-
-    Raises
-    ------
-    ValueError: if the transmission angle sine is -ve, i.e. transmission angle is higher than 90 deg.
-
-    Returns
-    -------
-    None if TIR else the transmission angle sine
-
-    '''
-    
-    sinIncidenceAngle = np.sqrt(1 - cosIncidenceAngle**2)
-    
-    sinTransmissionAngle = (currentVolumeRIndex/nextVolumeRIndex)*sinIncidenceAngle
-    
-    #= check if tranmission is feasible
-    if sinTransmissionAngle > 1.0:
-        return None
-    else:
-        if sinTransmissionAngle < 0.0:
-            incidenceAngle = np.pi - np.arccos(np.clip(cosIncidenceAngle, -1.0, 1.0))
-            raise ValueError('The calculated transmission angle is higher than 90 deg...\n'
-                             +' - photon incidence angle: {}deg, incidence n:{}, transmission n:{}'.format(np.degrees(incidenceAngle),
-                                                                                                           currentVolumeRIndex,
-                                                                                                           nextVolumeRIndex))
-        return sinTransmissionAngle
-
-
-
-def calculateReflectionProbability(cosIncidenceAngle, sinTransmissionAngle, currentVolumeRIndex, nextVolumeRIndex):
-    '''
-    calculating the photon reflection probability
-
-    Parameters
-    ----------
-    cosIncidenceAngle    : float
-                           Cosine of the incidence angle.
-    sinTransmissionAngle : float
-                           Sine of the transmission angle.
-    currentVolumeRIndex  : float
-                           Index of refraction of the incidence volume.
-    nextVolumeRIndex     : float
-                           Index of refraction of the transmission volume.
-
-    Raises
-    ------
-    ValueError: if the calculated reflection probability is higher than 1.0.
-
-    Returns
-    -------
-    R : float
-        The reflection probability of the incident photon.
-
-    '''
-    
-    cosTransmissionAngle = np.sqrt(1 - sinTransmissionAngle**2)
-    
-    #= calculate the reflection coefficient in the perpendicular polarization direction
-    rPerpendicular = (currentVolumeRIndex*cosIncidenceAngle - nextVolumeRIndex*cosTransmissionAngle)\
-                   / (currentVolumeRIndex*cosIncidenceAngle + nextVolumeRIndex*cosTransmissionAngle)
-    #= calculate the reflection coefficient in the parallel polarization direction
-    rParallel = (currentVolumeRIndex*cosTransmissionAngle - nextVolumeRIndex*cosIncidenceAngle)\
-              / (currentVolumeRIndex*cosTransmissionAngle + nextVolumeRIndex*cosIncidenceAngle)
-    
-    #= average both coefficients to estimate the reflection probabilty ???????????????????  (to be uppdated - AM 5/7/2021)
-    R = 0.5*(rPerpendicular**2 + rParallel**2)
-    
-    #= stop if the calculated probability is higher that 1.0
-    if R > 1.0:
-        incidenceAngle    = np.pi - np.arccos(np.clip(cosIncidenceAngle, -1.0, 1.0))
-        transmissionAngle = np.arcsin(sinTransmissionAngle)
-        raise ValueError('The calculated reflection probability is higher that 1.0...\n'
-                         +' - estimated incidence angle:{}deg, transmission angle:{}deg'.format(np.degrees(incidenceAngle),
-                                                                                                np.degrees(transmissionAngle)))
-    
-    return R
-
-
-
-def doReflection(opMomentumDir, opPolarizationDir, intersectNormal):
+def doLambertian(opMomentumDir, opPolarizationDir, intersectNormal):
     '''
     calculating the reflected ray new momentum and polarization directions
-                                   P_r = I - 2(I.n)n
-    For the derivation, refer to:
-        https://www.scratchapixel.com/lessons/3d-basic-rendering/introduction-to-shading/reflection-refraction-fresnel
+    
+    There are two methods:
+        a. around the z-axis:
+            theta = arcsin(sqrt(rand)), phi = 2*pi*rand
+           implemented below around a given normal N by rotating to an orthonormal basis of N, which yields an
+           accepted direction from a single pair of random numbers
+        b. around a given normal N:
+            used in GEANT4 by rejection sampling of isotropic directions
+            
+    For more information about the correct way of sampling from lambertian distribution (important and contrary to intuition), refer to:
+        https://www.particleincell.com/2015/cosine-distribution/
+        https://www.sciencedirect.com/science/article/pii/S0042207X02001732
+        
 
     Parameters
     ----------
@@ -538,82 +997,39 @@ def doReflection(opMomentumDir, opPolarizationDir, intersectNormal):
 
     '''
     
-    #= calculate the momentum direction of the reflected ray
-    opReflectionMomentumDir = opMomentumDir\
-              - 2*np.dot(opMomentumDir, intersectNormal.transpose())*intersectNormal
-    #= due to limited numerical precision, renormalize to yield an exact unit vector
-    opReflectionMomentumDir /= np.linalg.norm(opReflectionMomentumDir)
-    
-    # =====????????????????????????????????????????????? (to be uppdated - AM 5/7/2021)
-    opReflectionPolarizationDir = opPolarizationDir
-    
-    return opReflectionMomentumDir, opReflectionPolarizationDir
-
-
-
-def doTransmission(opMomentumDir, opPolarizationDir, intersectNormal,
-                   cosIncidenceAngle, sinTransmissionAngle, currentVolumeRIndex, nextVolumeRIndex):
-    '''
-    calculating the transmitted ray new momentum and polarization directions
-                            P_t = (n_i/n_t)*(I + cos(theta_i)n) - cos(theta_t)n
-    For a derivation, refer to:
-        https://www.scratchapixel.com/lessons/3d-basic-rendering/introduction-to-shading/reflection-refraction-fresnel
-
-    Parameters
-    ----------
-    opMomentumDir                 : (1x3) array of floats
-                                    Photon's momentum direction unit vector.
-    opPolarizationDir             : (1x3) array of floats
-                                    Photon's polarization direction unit vector.
-    intersectNormal               : (1x3) array of floats
-                                    Normal unit vector of the intersected face.
-    cosIncidenceAngle             : float
-                                    Cosine of the incidence angle.
-    sinTransmissionAngle          : float
-                                    Sine of the transmission angle.
-    currentVolumeRIndex           : float
-                                    Index of refraction of the incidence volume.
-    nextVolumeReIndex             : float
-                                    Index of refraction of the transmission volume.
-
-    Yields
-    ------
-    opTransmissionMomentumDir     : (1x3) array of floats
-                                    Transmitted photon's momentum direction unit vector.
-    opTransmissionPolarizationDir : (1x3) array of floats
-                                    Transmitted photon's polarization direction unit vector.
-
-    '''
+    #= sample the polar and azimuth angles of the reflected ray around the normal by inverting the lambertian CDF
+    u1, u2   = RANDOM_BUFFER.uniform(), RANDOM_BUFFER.uniform()
+    cosTheta = math.sqrt(1 - u2)
+    sinTheta = math.sqrt(u2)
+    phi      = 2*math.pi*u1
     
-    cosTransmissionAngle = np.sqrt(1 - sinTransmissionAngle**2)
+    #= build an orthonormal basis of the normal without branching on its orientation
+    #  For the derivation, refer to:
+    #      Duff et al., "Building an Orthonormal Basis, Revisited", JCGT 6(1), 2017
+    nx, ny, nz = intersectNormal.ravel().tolist()
+    sign       = math.copysign(1.0, nz)
+    a          = -1/(sign + nz)
+    b          = nx*ny*a
+    t1x, t1y, t1z = 1 + sign*nx*nx*a, sign*b, -sign*nx
+    t2x, t2y, t2z = b, sign + ny*ny*a, -ny
     
-    #= calculate the momentum direction of the transmitted ray
-    opTransmissionMomentumDir = (currentVolumeRIndex/nextVolumeRIndex)*(opMomentumDir+cosIncidenceAngle*intersectNormal)\
-                                    - intersectNormal*cosTransmissionAngle
-    #= due to limited numerical precision, renormalize to yield an exact unit vector
-    opTransmissionMomentumDir /= np.linalg.norm(opTransmissionMomentumDir)
+    #= sample a momentum direction of the reflected ray, which is a unit vector by construction
+    c1, c2 = sinTheta*math.cos(phi), sinTheta*math.sin(phi)
+    opReflectionMomentumDir = np.array([[c1*t1x + c2*t2x + cosTheta*nx,
+                                         c1*t1y + c2*t2y + cosTheta*ny,
+                                         c1*t1z + c2*t2z + cosTheta*nz]])
     
-    # =====????????????????????????????????????????????? (to be uppdated - AM 5/7/2021)
-    opTransmissionPolarizationDir = opPolarizationDir
-        
-    return opTransmissionMomentumDir, opTransmissionPolarizationDir
+    # =====????????????????????????????????????????????? (to be uppdated - AM 9/27/2021)
+    opReflectionPolarizationDir = opPolarizationDir
+    
+    return opReflectionMomentumDir, opReflectionPolarizationDir
 
 
 
-def doLambertian(opMomentumDir, opPolarizationDir, intersectNormal):
+def doSpecularLobeReflection(opMomentumDir, opPolarizationDir, intersectNormal, outPolarAngle, outAzimuthAngle):
     '''
-    calculating the reflected ray new momentum and polarization directions
-    
-    There are two methods:
-        a. around the z-axis:
-            theta = arcsin(sqrt(rand)), phi = 2*pi*rand
-        b. around a given normal N:
-            used in GEANT4 and implemented below
-            
-    For more information about the correct way of sampling from lambertian distribution (important and contrary to intuition), refer to:
-        https://www.particleincell.com/2015/cosine-distribution/
-        https://www.sciencedirect.com/science/article/pii/S0042207X02001732
-        
+    calculating the specular lobe reflected ray new momentum and polarization directions given its polar angle
+    relative to the normal and its azimuth angle relative to the plane of incidence
 
     Parameters
     ----------
@@ -623,6 +1039,10 @@ def doLambertian(opMomentumDir, opPolarizationDir, intersectNormal):
                                   Photon's polarization direction unit vector.
     intersectNormal             : (1x3) array of floats
                                   Normal unit vector of the intersected face.
+    outPolarAngle               : float
+                                  Polar angle of the reflected ray in degrees.
+    outAzimuthAngle             : float
+                                  Azimuth angle of the reflected ray in degrees.
 
     Returns
     -------
@@ -633,25 +1053,29 @@ def doLambertian(opMomentumDir, opPolarizationDir, intersectNormal):
 
     '''
     
-    #= sample a momentum direction of the reflected ray
-    while True:
-        phi                           = 2*np.pi*np.random.rand()
-        dir_gamma                     = 2*np.random.rand() - 1
-        dir_alpha                     = np.sqrt(1-(dir_gamma**2)) * np.cos(phi)
-        dir_beta                      = np.sqrt(1-(dir_gamma**2)) * np.sin(phi)
-        opReflectionMomentumDir       = np.array([[dir_alpha, dir_beta, dir_gamma]])
-        opReflectionMomentumDir      /= np.linalg.norm(opReflectionMomentumDir)
-        
-        cosTheta = np.dot(opReflectionMomentumDir, intersectNormal.transpose())
-        
-        if cosTheta < 0.0:
-            opReflectionMomentumDir  *= -1
-            cosTheta                 *= -1
-        
-        if np.random.rand() < cosTheta:
-            break
+    #  Note: the basis and the components are calculated with scalar math on python floats, which avoids the numpy
+    #        dispatch overhead of the cross products and norms of (1x3) arrays.
+    dx, dy, dz = opMomentumDir.ravel().tolist()
+    nx, ny, nz = intersectNormal.ravel().tolist()
+    
+    #= get the unit vectors perpendicular to and parallel with the plane of incidence
+    px, py, pz = ny*dz - nz*dy, nz*dx - nx*dz, nx*dy - ny*dx
+    norm       = math.sqrt(px*px + py*py + pz*pz)
+    px, py, pz = px/norm, py/norm, pz/norm
+    ax, ay, az = py*nz - pz*ny, pz*nx - px*nz, px*ny - py*nx
+    norm       = math.sqrt(ax*ax + ay*ay + az*az)
+    ax, ay, az = ax/norm, ay/norm, az/norm
+    
+    #= combine the components of the reflected ray
+    polarAngle, azimuthAngle = math.radians(outPolarAngle), math.radians(outAzimuthAngle)
+    cPara      = math.sin(polarAngle)*math.cos(azimuthAngle)
+    cPerp      = math.sin(polarAngle)*math.sin(azimuthAngle)
+    cNorm      = math.cos(polarAngle)
+    rx, ry, rz = cPara*ax + cPerp*px + cNorm*nx, cPara*ay + cPerp*py + cNorm*ny, cPara*az + cPerp*pz + cNorm*nz
+    #= due to limited numerical precision, renormalize to yield an exact unit vector
+    norm       = math.sqrt(rx*rx + ry*ry + rz*rz)
+    opReflectionMomentumDir = np.array([[rx/norm, ry/norm, rz/norm]])
     
-    # =====????????????????????????????????????????????? (to be uppdated - AM 9/27/2021)
     opReflectionPolarizationDir = opPolarizationDir
     
     return opReflectionMomentumDir, opReflectionPolarizationDir
@@ -680,11 +1104,13 @@ def traveledDistanceAndTime(opPosition, intersectPoint, currentVolumeRIndex):
 
     '''
     
-    traveledDistance    = np.round(np.linalg.norm(intersectPoint - opPosition), 9) # um
-    
-    photonSpeedInMedium = 299792458*1E-3 / currentVolumeRIndex                     # um/ns
+    x0, y0, z0          = opPosition.ravel().tolist()
+    x1, y1, z1          = intersectPoint.ravel().tolist()
+    dx, dy, dz          = x1 - x0, y1 - y0, z1 - z0
+    traveledDistance    = math.sqrt(dx*dx + dy*dy + dz*dz)                         # um
     
-    traveledTime        = traveledDistance/photonSpeedInMedium                     # ns
+    #= the photon speed in the medium is c/n
+    traveledTime        = traveledDistance*currentVolumeRIndex/SPEED_OF_LIGHT      # ns
     
     return traveledDistance, traveledTime
     
@@ -702,7 +1128,7 @@ def updatePhotonInfo(oPhoton, opTrackingHistory,
     ----------
     oPhoton              : opticalPhoton object
     opTrackingHistory    : structured numpy array
-                           Complete previous tracking history of the photon.
+                           Buffer of the photon's tracking history with its first oPhoton.historyLength steps recorded.
     intersectPoint       : (1x3) array of floats
                            Intersection point with a surface at current step in um.
     interactType         : string
@@ -729,34 +1155,32 @@ def updatePhotonInfo(oPhoton, opTrackingHistory,
     oPhoton              : opticalPhoton object
                            Updated.
     opTrackingHistory    : structured numpy array
-                           Updated with current step.
+                           Updated with current step, and reallocated with double the size if it was full.
 
     '''
     
-    incidenceAngle    = np.arccos(np.clip(cosIncidenceAngle, -1.0, 1.0))
+    #= retrieve info from last step to update current one
+    lastStep          = opTrackingHistory[oPhoton.historyLength-1]
+    
+    #  Note: the angles and the weight are calculated with scalar math on python floats so that the current step
+    #        is written to the tracking history buffer by a single tuple assignment without numpy temporaries.
+    incidenceAngle    = math.acos(min(max(cosIncidenceAngle, -1.0), 1.0))
     if sinTransmissionAngle is not None:
-        outAngle = np.arcsin(sinTransmissionAngle)
+        outAngle = math.asin(sinTransmissionAngle)
     else:
-        if opTrackingHistory[-1]['volume'] == b'reflector' and oPhoton.volume == 'reflector':
-            cosOutAngle = np.dot(newMomentumDir, -1*intersectNormal.transpose())
-            outAngle    = np.arccos(np.clip(cosOutAngle, -1.0, 1.0))
+        if lastStep['volume'] == b'reflector' and oPhoton.volume == 'reflector':
+            dx, dy, dz  = newMomentumDir.ravel().tolist()
+            nx, ny, nz  = intersectNormal.ravel().tolist()
+            cosOutAngle = -(dx*nx + dy*ny + dz*nz)
+            outAngle    = math.acos(min(max(cosOutAngle, -1.0), 1.0))
         else:
             outAngle = incidenceAngle
     
-    #= retrieve info from last step to update current one
-    p                 = opTrackingHistory[-1]['id']
-    step              = opTrackingHistory[-1]['step']+1
-    inMoemntumDir     = opTrackingHistory[-1]['outMomentumDir']
-    inPolarizationDir = opTrackingHistory[-1]['outPolarizationDir']
-    relTime           = opTrackingHistory[-1]['relTime']
-    
-    intersectPlaneOrientation = {(-1.0, 0.0, 0.0): '-x',
-                                  (1.0, 0.0, 0.0): '+x',
-                                 (0.0, -1.0, 0.0): '-y',
-                                  (0.0, 1.0, 0.0): '+y',
-                                 (0.0, 0.0, -1.0): '-z',
-                                  (0.0, 0.0, 1.0): '+z'
-                                 }
+    p                 = lastStep['id']
+    step              = lastStep['step']+1
+    inMoemntumDir     = lastStep['outMomentumDir']
+    inPolarizationDir = lastStep['outPolarizationDir']
+    relTime           = lastStep['relTime']
     
     #= update the the photon attributes
     #  Note: the volume is updated outside following the interaction type
@@ -765,20 +1189,29 @@ def updatePhotonInfo(oPhoton, opTrackingHistory,
     oPhoton.polarizationDir   = newPolarizationDir
     oPhoton.time             += traveledTime
     oPhoton.traveledDistance += traveledDistance
-    oPhoton.weight           *= np.exp(-(traveledDistance*1E-3)/attenuationLength)
+    oPhoton.weight           *= math.exp(-(traveledDistance*1E-3)/attenuationLength)
+    
+    #= double the size of the tracking history buffer if it's full
+    #  Note: this amortizes the reallocation and copying of the previous steps instead of appending every step,
+    #        which would copy the whole history each time.
+    if oPhoton.historyLength == len(opTrackingHistory):
+        opTrackingHistory = np.concatenate((opTrackingHistory, np.zeros_like(opTrackingHistory)))
+    
+    #= designate the intersected plane orientation directly from the axis and sign of its axis-aligned normal vector
+    normal = intersectNormal.ravel().tolist()
+    axis   = 0 if abs(normal[0]) > 0.5 else (1 if abs(normal[1]) > 0.5 else 2)
     
     #= update the photon tracking history with the current step
-    opTrackingHistory = np.append( opTrackingHistory,
-                                   np.array( [ (p,
+    opTrackingHistory[oPhoton.historyLength] = (p,
                                                 step,
                                                 oPhoton.position*1E-3,
                                                 interactType,
-                                                intersectPlaneOrientation[tuple(map(tuple,intersectNormal))[0]],
+                                                PLANE_ORIENTATION_LABELS[2*axis + (normal[axis] > 0)],
                                                 oPhoton.volume,
                                                 inMoemntumDir,
                                                 oPhoton.momentumDir,
-                                                np.degrees(incidenceAngle),
-                                                np.degrees(outAngle),
+                                                math.degrees(incidenceAngle),
+                                                math.degrees(outAngle),
                                                 inPolarizationDir,
                                                 oPhoton.polarizationDir,
                                                 oPhoton.time,
@@ -786,25 +1219,24 @@ def updatePhotonInfo(oPhoton, opTrackingHistory,
                                                 oPhoton.traveledDistance*1E-3,
                                                 oPhoton.weight
                                                 )
-                                              ], dtype = opTrackingHistory.dtype)
-                                   )
+    oPhoton.historyLength += 1
     
     return oPhoton, opTrackingHistory
 
 
 
-def pointIsWithinVolumeBounds(opVolume, trimeshIntersectPoint, volumeIntersectPlaneNormal):
+def pointIsWithinVolumeBounds(opVolume, trimeshIntersectPoint, planeKey):
     '''
     checking whether the trimesh intersection point is outside the volume boundaries in the lateral directions
 
     Parameters
     ----------
-    opVolume                   : trimesh volume object
-                                 The photon current associated volume.
-    trimeshIntersectPoint      : (1x3) array of floats
-                                 Intersection point with the trimesh in um.
-    volumeIntersectPlaneNormal : (1x3) array of floats
-                                 Normal unit vector of the volume's intersected plane.
+    opVolume              : volume object
+                            The photon current associated volume.
+    trimeshIntersectPoint : (1x3) array of floats
+                            Intersection point with the trimesh in um.
+    planeKey              : int
+                            Encoded normal vector of the volume's intersected plane.
 
     Returns
     -------
@@ -812,24 +1244,15 @@ def pointIsWithinVolumeBounds(opVolume, trimeshIntersectPoint, volumeIntersectPl
 
     '''
     
-    #= get the lateral coordinates indices
-    lateralCoordIndices = np.where(volumeIntersectPlaneNormal[0, :] == 0.0)[0]
-    
-    #= get the volume bounds
-    #  Note: rounding the volume bounds is because of the floating point errors in some
+    #= get the precomputed lateral coordinates indices and volume bounds of the intersected plane
+    #  Note: the volume bounds are already rounded because of the floating point errors in some
     #        of the constructed volume trimeshes.
-    ax1_bounds = np.round([opVolume.bounds[0, lateralCoordIndices[0]], opVolume.bounds[1, lateralCoordIndices[0]]], 9)
-    ax2_bounds = np.round([opVolume.bounds[0, lateralCoordIndices[1]], opVolume.bounds[1, lateralCoordIndices[1]]], 9)
+    ax1, ax2, ax1_lower, ax1_upper, ax2_lower, ax2_upper = opVolume.lateralBounds[planeKey]
     
     #= get the intersection point lateral coordinates
-    ax1_coordinate = trimeshIntersectPoint[0, lateralCoordIndices[0]]
-    ax2_coordinate = trimeshIntersectPoint[0, lateralCoordIndices[1]]
+    point = trimeshIntersectPoint[0]
     
-    if ax1_coordinate > ax1_bounds[0] and ax1_coordinate < ax1_bounds[1]\
-        and ax2_coordinate > ax2_bounds[0] and ax2_coordinate < ax2_bounds[1]:
-        return True
-    else:
-        return False
+    return ax1_lower < point[ax1] < ax1_upper and ax2_lower < point[ax2] < ax2_upper
                 
 
 
@@ -865,45 +1288,60 @@ def interactWithLocalSurface(opMomentumDir, opPolarizationDir, localSurfaceNorma
 
     '''
     
+    #  Note: the Fresnel coefficients and the new momentum direction are calculated in a single pass with scalar math
+    #        on python floats, so that the vectors are unpacked once and only the new momentum direction array is
+    #        allocated.
+    dx, dy, dz = opMomentumDir.ravel().tolist()
+    nx, ny, nz = localSurfaceNormal.ravel().tolist()
     
     #= reverse local normal if incident on mesh from the outside
-    if np.matmul(opMomentumDir, localSurfaceNormal.transpose()) > 0:
-        localSurfaceNormal *= -1
-
-    #= calculate the incidence angle cosine
-    cosIncidenceAngle    = calculateCosineIncidenceAngle(opMomentumDir, localSurfaceNormal)
-    #= calculate the transmission angle sine in case of a potential refraction interaction at the boundary
-    #  Returns None if refraction is physically prohibited.
-    sinTransmissionAngle = calculateSineTransmissionAngle(cosIncidenceAngle,
-                                                          currentVolumeRIndex,
-                                                          nextVolumeRIndex)
-    ### == refraction is NOT physically prohibited
-    if sinTransmissionAngle is not None:
-        #= calculate the reflection probability
-        reflectionProb = calculateReflectionProbability(cosIncidenceAngle, sinTransmissionAngle,
-                                                        currentVolumeRIndex,
-                                                        nextVolumeRIndex)
-        ## sample reflection
-        if np.random.rand() < reflectionProb:
-            interactType = 'reflection'
-            # calculate photon's new momentum and polarization direction
-            newMomentumDir, newPolarizationDir = doReflection(opMomentumDir, opPolarizationDir,
-                                                              localSurfaceNormal)
-        ## sample transmission
-        else:
-            interactType = 'transmission'
-            # calculate photon's new momentum and polarization direction
-            newMomentumDir, newPolarizationDir = doTransmission(opMomentumDir, opPolarizationDir,
-                                                                localSurfaceNormal,
-                                                                cosIncidenceAngle, sinTransmissionAngle,
-                                                                currentVolumeRIndex,
-                                                                nextVolumeRIndex)
+    #  Note: the caller's normal isn't mutated, and the reversal is applied as a sign multiplier instead of branching
+    #        on the random incidence side.
+    dotProduct = dx*nx + dy*ny + dz*nz
+    sign       = 1.0 - 2.0*(dotProduct > 0.0)
+    nx, ny, nz, dotProduct = sign*nx, sign*ny, sign*nz, sign*dotProduct
+    
+    #= calculate the incidence angle cosine, the transmission angle sine and cosine in case of a potential refraction
+    #  interaction at the boundary, and the reflection probability
+    #  The sine is None if refraction is physically prohibited.
+    cosIncidenceAngle    = -dotProduct
+    relativeRIndex       = currentVolumeRIndex/nextVolumeRIndex
+    sinTransmissionAngle = relativeRIndex*math.sqrt(max(0.0, 1 - cosIncidenceAngle**2))
     ### == refraction is physically prohibited
+    if sinTransmissionAngle > 1.0:
+        interactType         = 'TIR'
+        sinTransmissionAngle = None
+    ### == refraction is NOT physically prohibited
+    else:
+        cosTransmissionAngle = math.sqrt(1 - sinTransmissionAngle**2)
+        rPerpendicular = (currentVolumeRIndex*cosIncidenceAngle - nextVolumeRIndex*cosTransmissionAngle)\
+                       / (currentVolumeRIndex*cosIncidenceAngle + nextVolumeRIndex*cosTransmissionAngle)
+        rParallel      = (currentVolumeRIndex*cosTransmissionAngle - nextVolumeRIndex*cosIncidenceAngle)\
+                       / (currentVolumeRIndex*cosTransmissionAngle + nextVolumeRIndex*cosIncidenceAngle)
+        reflectionProb = 0.5*(rPerpendicular**2 + rParallel**2)
+        #= stop if the calculated probability is higher that 1.0
+        if reflectionProb > 1.0:
+            raise ValueError('The calculated reflection probability is higher that 1.0...\n'
+                             +' - estimated incidence angle:{}deg, transmission angle:{}deg'.format(math.degrees(math.acos(min(cosIncidenceAngle, 1.0))),
+                                                                                                    math.degrees(math.asin(sinTransmissionAngle))))
+        ## sample reflection or transmission
+        interactType = 'reflection' if RANDOM_BUFFER.uniform() < reflectionProb else 'transmission'
+    
+    #= calculate photon's new momentum direction
+    if interactType == 'transmission':
+        #  P_t = (n_i/n_t)*(I + cos(theta_i)n) - cos(theta_t)n
+        mx = relativeRIndex*(dx + cosIncidenceAngle*nx) - nx*cosTransmissionAngle
+        my = relativeRIndex*(dy + cosIncidenceAngle*ny) - ny*cosTransmissionAngle
+        mz = relativeRIndex*(dz + cosIncidenceAngle*nz) - nz*cosTransmissionAngle
     else:
-        interactType = 'TIR'
-        # calculate photon's new momentum and polarization direction
-        newMomentumDir, newPolarizationDir = doReflection(opMomentumDir, opPolarizationDir,
-                                                          localSurfaceNormal)
+        #  P_r = I - 2(I.n)n
+        mx, my, mz = dx - 2*dotProduct*nx, dy - 2*dotProduct*ny, dz - 2*dotProduct*nz
+    #= due to limited numerical precision, renormalize to yield an exact unit vector
+    norm           = math.sqrt(mx*mx + my*my + mz*mz)
+    newMomentumDir = np.array([[mx/norm, my/norm, mz/norm]])
+    
+    # =====????????????????????????????????????????????? (to be uppdated - AM 5/7/2021)
+    newPolarizationDir = opPolarizationDir
         
     return interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir
                 
@@ -939,49 +1377,41 @@ def interactWithReflector(reflectorMaterial, reflectorIntersectPlaneNormal, opMo
     '''
     
     #= calculate the incidence angle cosine
-    cosIncidenceAngle   = calculateCosineIncidenceAngle(opMomentumDir, reflectorIntersectPlaneNormal)
+    cosIncidenceAngle   = calculateCosineIncidenceAngle(opMomentumDir, reflectorIntersectPlaneNormal).item()
     ## sample reflection
-    if np.random.rand() < reflectorMaterial['reflectivity']:
+    if RANDOM_BUFFER.uniform() < reflectorMaterial['reflectivity']:
         interactType = 'reflection'
         sinTransmissionAngle = None
         # calculate the incidence angle
-        incidenceAngle      = np.degrees(np.arccos(np.clip(cosIncidenceAngle, -1.0, 1.0)))
+        incidenceAngle      = math.degrees(math.acos(min(max(cosIncidenceAngle, -1.0), 1.0)))
         # calculate the lambertian reflection probability
-        fitParams = reflectorMaterial['lambertianFraction']['doubleExpFitParams']
-        lambertianFraction = fitParams['a1']*np.exp(fitParams['b1']*incidenceAngle) + fitParams['a2']*np.exp(fitParams['b2']*incidenceAngle)
+        a1, b1, a2, b2      = reflectorMaterial['lambertianFraction']['doubleExpFitCoefficients']
+        lambertianFraction  = a1*math.exp(b1*incidenceAngle) + a2*math.exp(b2*incidenceAngle)
         # sample lambertian reflection
-        if np.random.rand() < lambertianFraction:
+        if RANDOM_BUFFER.uniform() < lambertianFraction:
             # calculate photon's new momentum and polarization direction
             newMomentumDir, newPolarizationDir =  doLambertian(opMomentumDir, opPolarizationDir,
                                                                reflectorIntersectPlaneNormal)
         # sample specular lobe reflection
         else:
             # sample the reflected ray polar angle (relative to surface normal) & azimuth angle (relative to the plane of incidence)
-            gaussianSigma = reflectorMaterial['specularLobeSigma'][1, np.where(reflectorMaterial['specularLobeSigma'][0, :] == int(np.round(incidenceAngle, 0)))[0]]
-            while True:
-                outPolarAngle     = np.random.normal(loc=incidenceAngle, scale=gaussianSigma)
-                if outPolarAngle >= 0.0 and outPolarAngle <= 90.0:
-                    break
-            outAzimuthAngle     = np.random.normal(loc=0.0, scale=gaussianSigma)
+            gaussianSigma = reflectorMaterial['specularLobeSigmaLookup'][int(round(incidenceAngle))]
+            # sample the polar angle from the gaussian truncated to [0, 90] deg by inverting its CDF
+            lowerCDF      = ndtr((0.0 - incidenceAngle)/gaussianSigma)
+            upperCDF      = ndtr((90.0 - incidenceAngle)/gaussianSigma)
+            outPolarAngle = incidenceAngle + gaussianSigma*ndtri(lowerCDF + RANDOM_BUFFER.uniform()*(upperCDF - lowerCDF))
+            outPolarAngle = min(max(outPolarAngle, 0.0), 90.0)
+            outAzimuthAngle     = RANDOM_BUFFER.normal(loc=0.0, scale=gaussianSigma)
             
             # calculate photon's new momentum and polarization direction
-            incidencePlanePerp  = np.cross(reflectorIntersectPlaneNormal, opMomentumDir)
-            incidencePlanePerp /= np.linalg.norm(incidencePlanePerp)
-            incidencePlanePara  = np.cross(incidencePlanePerp, reflectorIntersectPlaneNormal)
-            incidencePlanePara /= np.linalg.norm(incidencePlanePara)
-            
-            paraComponent = incidencePlanePara * np.sin(np.radians(outPolarAngle)) * np.cos(np.radians(outAzimuthAngle))
-            perpComponent = incidencePlanePerp * np.sin(np.radians(outPolarAngle)) * np.sin(np.radians(outAzimuthAngle))
-            normComponent = reflectorIntersectPlaneNormal * np.cos(np.radians(outPolarAngle))
-            
-            newMomentumDir     = paraComponent + perpComponent + normComponent
-            newMomentumDir    /= np.linalg.norm(newMomentumDir)
-            newPolarizationDir = opPolarizationDir
+            newMomentumDir, newPolarizationDir = doSpecularLobeReflection(opMomentumDir, opPolarizationDir,
+                                                                          reflectorIntersectPlaneNormal,
+                                                                          outPolarAngle, outAzimuthAngle)
             
     ## sample transmission
     else:
         interactType = 'transmission'
-        sinTransmissionAngle = np.sqrt(1 - np.dot(opMomentumDir, -1*reflectorIntersectPlaneNormal.transpose())**2)
+        sinTransmissionAngle = math.sqrt(max(0.0, 1 - cosIncidenceAngle**2))
         newMomentumDir, newPolarizationDir = opMomentumDir, opPolarizationDir
         
     return interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir
@@ -1017,13 +1447,17 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
     
     #= determine which of the optical photon volume and nextVolume has roughness
     surfaceTrimeshesVolume = oPhoton.volume if volumeList[oPhoton.volume].surfaceTrimeshes else nextVolume
+    #  Note: the volume and the intersected plane key are retrieved once since the photon keeps transporting over
+    #        its surface trimesh
+    boundingVolume         = volumeList[surfaceTrimeshesVolume]
+    planeKey               = volume.encodeNormal(volumeIntersectPlaneNormal[0])
             
     #= prepare surface trimesh and get first intersection point
-    surfaceTrimesh, trimeshIntersectPoint, trimeshIntersectFaceNormal = prepareSurfaceTrimesh(oPhoton.position,
-                                                                                              oPhoton.momentumDir,
-                                                                                              volumeList[surfaceTrimeshesVolume],
-                                                                                              volumeIntersectPoint,
-                                                                                              volumeIntersectPlaneNormal)
+    surfaceTrimesh, shiftVector, trimeshIntersectPoint, trimeshIntersectFaceNormal = prepareSurfaceTrimesh(oPhoton.position,
+                                                                                                           oPhoton.momentumDir,
+                                                                                                           boundingVolume,
+                                                                                                           volumeIntersectPoint,
+                                                                                                           volumeIntersectPlaneNormal)
     if len(trimeshIntersectPoint) == 0:
         oPhoton.alive = False
         print(' - a photon was killed due to being trapped at a corner ...')
@@ -1032,6 +1466,14 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
                                                                                                                          oPhoton.momentumDir,
                                                                                                                          volumeIntersectPlaneNormal))
     
+    #= retrieve the photon's current and next volumes properties once
+    #  Note: they are exchanged or refreshed only when either volume changes, i.e. after a transmission or an
+    #        interaction with the reflector.
+    refractiveIndex                = volumeList[oPhoton.volume].material['refractiveIndex']
+    attenuationLength              = volumeList[oPhoton.volume].material['attenuationLength']                          # mm
+    nextRefractiveIndex            = volumeList[nextVolume].material['refractiveIndex']
+    nextAttenuationLength          = volumeList[nextVolume].material['attenuationLength']                              # mm
+    
     # counter of local intersections at the current surface trimesh
     # Up to 20 intersections (arbitrary) then the photon is killed as this situation represents feature-trapping
     localSurfaceMeshIntersectCounter = 0
@@ -1041,8 +1483,7 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
         #  if it's still within it
         #  If not, the photon escaped the volume while transporting the surface trimesh features and so is killed.
         #  Note: this is not a robust method, but is assumed to be sufficient should this be rare to happen.
-        boundingVolume = volumeList[surfaceTrimeshesVolume].volumeTrimesh
-        if not pointIsWithinVolumeBounds(boundingVolume, trimeshIntersectPoint, volumeIntersectPlaneNormal):
+        if not pointIsWithinVolumeBounds(boundingVolume, trimeshIntersectPoint, planeKey):
             oPhoton.alive = False
             print(' - a photon was killed due to escaping its volume bounds while transporting trimesh features ...')
             print('   intersected trimesh orientation: {} ...'.format(volumeIntersectPlaneNormal))
@@ -1050,29 +1491,30 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
         localSurfaceMeshIntersectCounter += 1
         
         
-        #= retrieve photon's current volume properties before any updating of the volume
-        refractiveIndex                = volumeList[oPhoton.volume].material['refractiveIndex']                         
-        attenuationLength              = volumeList[oPhoton.volume].material['attenuationLength']                         # mm
-        
         #= interact with surface
         interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir = interactWithLocalSurface(oPhoton.momentumDir,
                                                                                                                              oPhoton.polarizationDir,
                                                                                                                              trimeshIntersectFaceNormal,
-                                                                                                                             volumeList[oPhoton.volume].material['refractiveIndex'],
-                                                                                                                             volumeList[nextVolume].material['refractiveIndex'])
-        # exchange the photon current and next volumes in case of transmission
-        if interactType == 'transmission':
-            oPhoton.volume, nextVolume = nextVolume, oPhoton.volume
+                                                                                                                             refractiveIndex,
+                                                                                                                             nextRefractiveIndex)
         
-        #= estimate traveled distance and spent time
+        #= estimate traveled distance and spent time within the photon's volume before any updating of the volume
         traveledDistance, traveledTime = traveledDistanceAndTime(oPhoton.position, trimeshIntersectPoint,
                                                                  refractiveIndex)
+        travelAttenuationLength        = attenuationLength
+        
+        # exchange the photon current and next volumes and their properties in case of transmission
+        if interactType == 'transmission':
+            oPhoton.volume, nextVolume                = nextVolume, oPhoton.volume
+            refractiveIndex, nextRefractiveIndex      = nextRefractiveIndex, refractiveIndex
+            attenuationLength, nextAttenuationLength  = nextAttenuationLength, attenuationLength
+        
         #= update the photon attributes and tracking history
         oPhoton, opTrackingHistory = updatePhotonInfo(oPhoton, opTrackingHistory,
                                                       trimeshIntersectPoint, interactType, volumeIntersectPlaneNormal,
                                                       newMomentumDir, newPolarizationDir,
                                                       cosIncidenceAngle, sinTransmissionAngle,
-                                                      traveledDistance, traveledTime, attenuationLength)
+                                                      traveledDistance, traveledTime, travelAttenuationLength)
         
         #= kill if up to 20 (arbitrary) local surface trimesh occur
         if localSurfaceMeshIntersectCounter > 20:
@@ -1084,7 +1526,8 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
         #= get the next local intersection point and local normal
         trimeshIntersectPoint, trimeshIntersectFaceNormal = getSurfaceTrimeshIntersection(surfaceTrimesh,
                                                                                           oPhoton.position,
-                                                                                          oPhoton.momentumDir)
+                                                                                          oPhoton.momentumDir,
+                                                                                          shiftVector)
         
         
         
@@ -1092,8 +1535,7 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
         ### == interact with the 'reflector' volume, if any
         if len(trimeshIntersectPoint) == 0 and oPhoton.volume == 'reflector':
             #= intersect with the reflector volume, if any
-            reflectorIntersectPoint, _, reflectorIntersectTri = volumeList['reflector'].volumeTrimesh.ray.intersects_location(ray_origins    = oPhoton.position,
-                                                                                                                              ray_directions = oPhoton.momentumDir)
+            reflectorIntersectPoint, _, reflectorIntersectTri = intersectVolumeTriangles(volumeList['reflector'], oPhoton.position, oPhoton.momentumDir)
             reflectorIntersectPoint         = np.round(np.array([reflectorIntersectPoint[0]]), 9)
             reflectorIntersectPlaneNormal   = np.round(np.array([volumeList['reflector'].volumeTrimesh.face_normals[reflectorIntersectTri[0]]]), 9)
             
@@ -1101,9 +1543,6 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
             #  otherwise, the photon could have hit the reflector "non-true" boundary with the another volume and the
             #  getVolumeTrimeshIntersection() method is needed to detect that
             if (reflectorIntersectPlaneNormal == volumeIntersectPlaneNormal).all():
-                # retrieve photon's current volume properties before any updating of the volume
-                refractiveIndex                = volumeList[oPhoton.volume].material['refractiveIndex']                         
-                attenuationLength              = volumeList[oPhoton.volume].material['attenuationLength']                         # mm
                 #= perform interaction with reflector
                 interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir = interactWithReflector(volumeList[oPhoton.volume].material,
                                                                                                                                   -1*reflectorIntersectPlaneNormal,
@@ -1125,73 +1564,232 @@ def trackOverSurfaceTrimesh(volumeList, opTrackingHistory, oPhoton, volumeInters
                 
                 if interactType != 'transmission':
                     #= update remaining info before heading back towards the surfaceTrimeshesVolume
-                    nextVolume = surfaceTrimeshesVolume
+                    nextVolume            = surfaceTrimeshesVolume
+                    nextRefractiveIndex   = volumeList[nextVolume].material['refractiveIndex']
+                    nextAttenuationLength = volumeList[nextVolume].material['attenuationLength']              # mm
                     localSurfaceMeshIntersectCounter = 0
                     #= check if the photon returned to and iteracted with the surfaceTrimesh
                     trimeshIntersectPoint, trimeshIntersectFaceNormal = getSurfaceTrimeshIntersection(surfaceTrimesh,
                                                                                                       oPhoton.position,
-                                                                                                      oPhoton.momentumDir)
+                                                                                                      oPhoton.momentumDir,
+                                                                                                      shiftVector)
     
     
     return oPhoton, opTrackingHistory
 
 
 
-def trackPhoton(opTrackNumber, oPhoton, volumeList):
+def initializeTrackingHistory(opTrackNumber, oPhoton):
     '''
-    tracking an optical photon until it's either detected or killed
+    creating a photon's tracking history buffer with its emission as the first step
 
     Parameters
     ----------
     opTrackNumber     : int
                         Track number of the photon to be tracked.
     oPhoton           : opticalPhoton object
-    volumeList        : dict of volume objects
-                        All Geometry volume objects.
+                        Its historyLength is set to 1.
 
     Returns
     -------
     opTrackingHistory : structured numpy array
-                        The photon's tracking history
+                        Buffer of the photon's tracking history.
 
     '''
     #= specify the data types of the tracking history elements (columns)
+    #  Note: the unit vectors, angles, traveled distance and weight are recorded in float32 since they are only
+    #        written out and their relative precision of ~1E-7 is ample. The position and times are kept in float64;
+    #        the positions are of sub-um features up to 1E2 mm away from the origin and relTime is accumulated from
+    #        the recorded previous step. The photon attributes themselves are always kept in float64.
     dtype = [('id', np.int32),
              ('step', np.int32),
              ('position', np.float64, (3, )),
              ('type', 'S15'),
-             ('planeOrientation', 'S15'),
+             ('planeOrientation', 'S4'),
              ('volume', 'S15'),
-             ('inMomentumDir', np.float64, (3, )),
-             ('outMomentumDir', np.float64, (3, )),
-             ('inAngle', np.float64),
-             ('outAngle', np.float64),
-             ('inPolarizationDir', np.float64, (3, )),
-             ('outPolarizationDir', np.float64, (3, )),
+             ('inMomentumDir', np.float32, (3, )),
+             ('outMomentumDir', np.float32, (3, )),
+             ('inAngle', np.float32),
+             ('outAngle', np.float32),
+             ('inPolarizationDir', np.float32, (3, )),
+             ('outPolarizationDir', np.float32, (3, )),
              ('absTime', np.float64),
              ('relTime', np.float64),
-             ('distance', np.float64),
-             ('weight', np.float64)
+             ('distance', np.float32),
+             ('weight', np.float32)
             ]
-    #= create a structured array with the first step of the current photon tracking history
-    opTrackingHistory = np.array( [ (opTrackNumber,
-                                     0.0,
-                                     oPhoton.position*1E-3,
-                                     'emission',
-                                     None,
-                                     oPhoton.volume,
-                                     None,
-                                     oPhoton.momentumDir,
-                                     None,
-                                     None,
-                                     None,
-                                     oPhoton.polarizationDir,
-                                     oPhoton.time,
-                                     0.0,
-                                     0.0,
-                                     oPhoton.weight
-                                    )
-                                  ], dtype = dtype)
+    #= create a structured array buffer with the first step of the current photon tracking history
+    #  Note: the buffer starts with 64 (arbitrary) steps and is grown by updatePhotonInfo() as needed; only the
+    #        first oPhoton.historyLength steps are recorded.
+    opTrackingHistory = np.zeros(64, dtype = dtype)
+    opTrackingHistory[0] = (opTrackNumber,
+                            0.0,
+                            oPhoton.position*1E-3,
+                            'emission',
+                            None,
+                            oPhoton.volume,
+                            None,
+                            oPhoton.momentumDir,
+                            None,
+                            None,
+                            None,
+                            oPhoton.polarizationDir,
+                            oPhoton.time,
+                            0.0,
+                            0.0,
+                            oPhoton.weight
+                           )
+    oPhoton.historyLength = 1
+    
+    return opTrackingHistory
+
+
+
+def trackPhotonStep(volumeList, opTrackingHistory, oPhoton, volumeIntersectPoint, volumeIntersectPlaneNormal, nextVolume):
+    '''
+    tracking an optical photon for one step given its volume intersection, i.e. interacting with the intersected
+    plane or tracking over its surface trimesh, then checking whether the photon is killed or detected
+
+    Parameters
+    ----------
+    volumeList                 : dict of volume objects
+                                 All Geometry volume objects.
+    opTrackingHistory          : structured numpy array
+                                 Buffer of the photon's tracking history.
+    oPhoton                    : opticalPhoton object
+    volumeIntersectPoint       : (1x3) array of floats
+                                 Initial intersection point on a volume in um.
+    volumeIntersectPlaneNormal : (1x3) array of floats
+                                 Normal unit vector of the volume's intersected plane.
+    nextVolume                 : string
+                                 Next volume to the intersected plane, None if no intersections.
+
+    Returns
+    -------
+    oPhoton                    : opticalPhoton object
+                                 Updated.
+    opTrackingHistory          : structured numpy array
+                                 Updated.
+
+    '''
+    
+    # kill if no found intersections
+    if nextVolume is None:
+        oPhoton.alive = False
+        return oPhoton, opTrackingHistory
+    
+    #= retrieve the photon's current and next volume materials once for the step, i.e. before any updating of the volume
+    currentMaterial   = volumeList[oPhoton.volume].material
+    refractiveIndex   = currentMaterial['refractiveIndex']
+    attenuationLength = currentMaterial['attenuationLength']     # mm
+    currentHasMeshes  = bool(volumeList[oPhoton.volume].surfaceTrimeshes)
+    
+    #  reversing the orientation of the intersected plane if the photon's current associated volume has defined
+    #  surfaceTrimeshes.
+    #  This is becasue the surfaceTrimeshes are given designations that match the volume trimesh directions, i.e.
+    #  pointing outwards the volume.
+    if currentHasMeshes: volumeIntersectPlaneNormal *= -1
+    
+    
+    
+    
+    
+    
+    #### == interaction with the reflector
+    if oPhoton.volume == 'reflector' and nextVolume == 'reflector':
+        #= perform interaction with reflector
+        interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir = interactWithReflector(currentMaterial,
+                                                                                                                          volumeIntersectPlaneNormal,
+                                                                                                                          oPhoton.momentumDir,
+                                                                                                                          oPhoton.polarizationDir)
+        #= update the photon's volume to the outside 'environment' only in case of transmission
+        if interactType == 'transmission':
+            oPhoton.volume = 'environment'
+        #= estimate traveled distance and spent time
+        traveledDistance, traveledTime = traveledDistanceAndTime(oPhoton.position,
+                                                                 volumeIntersectPoint,
+                                                                 refractiveIndex)  # um, ns
+        #= update the photon attributes and tracking history
+        oPhoton, opTrackingHistory = updatePhotonInfo(oPhoton, opTrackingHistory,
+                                                      volumeIntersectPoint, interactType, -1*volumeIntersectPlaneNormal,
+                                                      newMomentumDir, newPolarizationDir,
+                                                      cosIncidenceAngle, sinTransmissionAngle,
+                                                      traveledDistance, traveledTime, attenuationLength)
+        return oPhoton, opTrackingHistory
+    
+    
+    
+    
+    
+    #### == the two volumes at the intersection plane are perfectly polished
+    if not currentHasMeshes and volumeList[nextVolume].surfaceTrimeshes == None:
+        #= interact with surface
+        interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir = interactWithLocalSurface(oPhoton.momentumDir,
+                                                                                                                             oPhoton.polarizationDir,
+                                                                                                                             volumeIntersectPlaneNormal,
+                                                                                                                             refractiveIndex,
+                                                                                                                             volumeList[nextVolume].material['refractiveIndex'])
+        # update photon's current volume in case of transmission
+        if interactType == 'transmission':
+            oPhoton.volume = nextVolume
+        
+        #= estimate traveled distance and spent time
+        traveledDistance, traveledTime = traveledDistanceAndTime(oPhoton.position,
+                                                                 volumeIntersectPoint,
+                                                                 refractiveIndex)       # um, ns
+        #= update the photon attributes and tracking history
+        oPhoton, opTrackingHistory = updatePhotonInfo(oPhoton, opTrackingHistory,
+                                                      volumeIntersectPoint, interactType, -1*volumeIntersectPlaneNormal,
+                                                      newMomentumDir, newPolarizationDir,
+                                                      cosIncidenceAngle, sinTransmissionAngle,
+                                                      traveledDistance, traveledTime, attenuationLength)
+    
+    
+    
+    #### == either of the two volumes at the intersection plane has roughness through a surface trimesh
+    else:
+        oPhoton, opTrackingHistory = trackOverSurfaceTrimesh(volumeList,
+                                                             opTrackingHistory,
+                                                             oPhoton,
+                                                             volumeIntersectPoint,
+                                                             volumeIntersectPlaneNormal,
+                                                             nextVolume)
+        
+        
+    #= kill if the photon weight drops under a minimum of 1E-4 (arbitrary)
+    if oPhoton.weight < 1E-4:
+        oPhoton.alive = False
+        print(' - a photon was killed because its weight dropped below the set minimum ...')
+    
+    #= score as a detected photon and kill if it reaches and refracts to any of the photodetector volumes
+    if oPhoton.volume == 'PD_l' or oPhoton.volume == 'PD_r':
+        oPhoton.alive = False
+        
+    
+    return oPhoton, opTrackingHistory
+
+
+
+def trackPhoton(opTrackNumber, oPhoton, volumeList):
+    '''
+    tracking an optical photon until it's either detected or killed
+
+    Parameters
+    ----------
+    opTrackNumber     : int
+                        Track number of the photon to be tracked.
+    oPhoton           : opticalPhoton object
+    volumeList        : dict of volume objects
+                        All Geometry volume objects.
+
+    Returns
+    -------
+    opTrackingHistory : structured numpy array
+                        The photon's tracking history
+
+    '''
+    #= create the tracking history buffer with the first step of the current photon
+    opTrackingHistory = initializeTrackingHistory(opTrackNumber, oPhoton)
     
     # == do as long as the photon status is 'alive'
     while oPhoton.alive:
@@ -1201,100 +1799,160 @@ def trackPhoton(opTrackNumber, oPhoton, volumeList):
                                                                                                     oPhoton.position,
                                                                                                     oPhoton.momentumDir,
                                                                                                     oPhoton.volume)
-        # break if no found intersections
-        if nextVolume is None:
-            oPhoton.alive = False
-            continue
-        
-        #  reversing the orientation of the intersected plane if the photon's current associated volume has defined
-        #  surfaceTrimeshes.
-        #  This is becasue the surfaceTrimeshes are given designations that match the volume trimesh directions, i.e.
-        #  pointing outwards the volume.
-        if volumeList[oPhoton.volume].surfaceTrimeshes: volumeIntersectPlaneNormal *= -1
-        
-        
-        
-        
-        
-        
-        #### == interaction with the reflector
-        if oPhoton.volume == 'reflector' and nextVolume == 'reflector':
-            # retrieve photon's current volume properties before any updating of the volume
-            refractiveIndex                = volumeList[oPhoton.volume].material['refractiveIndex']                         
-            attenuationLength              = volumeList[oPhoton.volume].material['attenuationLength']                         # mm
-            #= perform interaction with reflector
-            interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir = interactWithReflector(volumeList[oPhoton.volume].material,
-                                                                                                                              volumeIntersectPlaneNormal,
-                                                                                                                              oPhoton.momentumDir,
-                                                                                                                              oPhoton.polarizationDir)
-            #= update the photon's volume to the outside 'environment' only in case of transmission
-            if interactType == 'transmission':
-                oPhoton.volume = 'environment'
-            #= estimate traveled distance and spent time
-            traveledDistance, traveledTime = traveledDistanceAndTime(oPhoton.position,
-                                                                     volumeIntersectPoint,
-                                                                     refractiveIndex)  # um, ns
-            #= update the photon attributes and tracking history
-            oPhoton, opTrackingHistory = updatePhotonInfo(oPhoton, opTrackingHistory,
-                                                          volumeIntersectPoint, interactType, -1*volumeIntersectPlaneNormal,
-                                                          newMomentumDir, newPolarizationDir,
-                                                          cosIncidenceAngle, sinTransmissionAngle,
-                                                          traveledDistance, traveledTime, attenuationLength)
-            continue
-        
-        
-        
-        
-        
-        #### == the two volumes at the intersection plane are perfectly polished
-        if volumeList[oPhoton.volume].surfaceTrimeshes == None and volumeList[nextVolume].surfaceTrimeshes == None:
-            # retrieve photon's current volume properties before any updating of the volume
-            refractiveIndex                = volumeList[oPhoton.volume].material['refractiveIndex']                         
-            attenuationLength              = volumeList[oPhoton.volume].material['attenuationLength']                         # mm
-            #= interact with surface
-            interactType, cosIncidenceAngle, sinTransmissionAngle, newMomentumDir, newPolarizationDir = interactWithLocalSurface(oPhoton.momentumDir,
-                                                                                                                                 oPhoton.polarizationDir,
-                                                                                                                                 volumeIntersectPlaneNormal,
-                                                                                                                                 volumeList[oPhoton.volume].material['refractiveIndex'],
-                                                                                                                                 volumeList[nextVolume].material['refractiveIndex'])
-            # update photon's current volume in case of transmission
-            if interactType == 'transmission':
-                oPhoton.volume = nextVolume
-            
-            #= estimate traveled distance and spent time
-            traveledDistance, traveledTime = traveledDistanceAndTime(oPhoton.position,
-                                                                     volumeIntersectPoint,
-                                                                     refractiveIndex)       # um, ns
-            #= update the photon attributes and tracking history
-            oPhoton, opTrackingHistory = updatePhotonInfo(oPhoton, opTrackingHistory,
-                                                          volumeIntersectPoint, interactType, -1*volumeIntersectPlaneNormal,
-                                                          newMomentumDir, newPolarizationDir,
-                                                          cosIncidenceAngle, sinTransmissionAngle,
-                                                          traveledDistance, traveledTime, attenuationLength)
+        #= interact and update the photon
+        oPhoton, opTrackingHistory = trackPhotonStep(volumeList, opTrackingHistory, oPhoton,
+                                                     volumeIntersectPoint, volumeIntersectPlaneNormal, nextVolume)
         
+    return opTrackingHistory[:oPhoton.historyLength]
+
+
+
+def trackPhotons(sourcePhotons, volumeList, firstTrackNumber = 0):
+    '''
+    tracking a batch of optical photons together until they're all either detected or killed
+    
+    At every step, the alive photons are grouped into cohorts by their associated volume and each cohort is
+    intersected with the geometry volumes in a single batched call before the photons interact one by one.
+
+    Parameters
+    ----------
+    sourcePhotons       : list of opticalPhoton objects
+                          Photons to be tracked.
+    volumeList          : dict of volume objects
+                          All Geometry volume objects.
+    firstTrackNumber    : int, optional
+                          Track number of the first photon; the others are numbered consecutively.
+                          The default is 0.
+
+    Returns
+    -------
+    opTrackingHistories : list of structured numpy arrays
+                          The tracking history of each photon.
+
+    '''
+    
+    #= create the tracking history buffers with the first step of all photons
+    opTrackingHistories = [initializeTrackingHistory(firstTrackNumber+p, oPhoton) for p, oPhoton in enumerate(sourcePhotons)]
+    alivePhotons        = [p for p, oPhoton in enumerate(sourcePhotons) if oPhoton.alive]
+    
+    # == do as long as any photon status is 'alive'
+    while alivePhotons:
         
+        #= group the alive photons by their associated volume
+        cohorts = {}
+        for p in alivePhotons: cohorts.setdefault(sourcePhotons[p].volume, []).append(p)
         
-        #### == either of the two volumes at the intersection plane has roughness through a surface trimesh
-        else:
-            oPhoton, opTrackingHistory = trackOverSurfaceTrimesh(volumeList,
-                                                                 opTrackingHistory,
-                                                                 oPhoton,
-                                                                 volumeIntersectPoint,
-                                                                 volumeIntersectPlaneNormal,
-                                                                 nextVolume)
-            
-            
-        #= kill if the photon weight drops under a minimum of 1E-4 (arbitrary)
-        if oPhoton.weight < 1E-4:
-            oPhoton.alive = False
-            print(' - a photon was killed because its weight dropped below the set minimum ...')
+        for opVolume, cohort in cohorts.items():
+            #= find the volumes with which the cohort photons intersect
+            volumeIntersectPoints, volumeIntersectPlaneNormals, nextVolumes = getVolumeTrimeshIntersectionBatch(volumeList,
+                                                                                                               np.vstack([sourcePhotons[p].position for p in cohort]),
+                                                                                                               np.vstack([sourcePhotons[p].momentumDir for p in cohort]),
+                                                                                                               opVolume)
+            #= interact and update each photon
+            for c, p in enumerate(cohort):
+                volumeIntersectPoint       = volumeIntersectPoints[c:c+1].copy() if nextVolumes[c] is not None else None
+                volumeIntersectPlaneNormal = volumeIntersectPlaneNormals[c:c+1].copy() if nextVolumes[c] is not None else None
+                sourcePhotons[p], opTrackingHistories[p] = trackPhotonStep(volumeList, opTrackingHistories[p], sourcePhotons[p],
+                                                                           volumeIntersectPoint, volumeIntersectPlaneNormal, nextVolumes[c])
         
-        #= score as a detected photon and kill if it reaches and refracts to any of the photodetector volumes
-        if oPhoton.volume == 'PD_l' or oPhoton.volume == 'PD_r':
-            oPhoton.alive = False
-            
+        alivePhotons = [p for p in alivePhotons if sourcePhotons[p].alive]
         
-    return opTrackingHistory
+    return [opTrackingHistory[:oPhoton.historyLength] for opTrackingHistory, oPhoton in zip(opTrackingHistories, sourcePhotons)]
+
+
+
+def initializeWorker(volumeList):
+    '''
+    storing the geometry volumes in a worker process once instead of sending them along with every photon batch
+
+    Parameters
+    ----------
+    volumeList : dict of volume objects
+                 All Geometry volume objects.
+
+    Returns
+    -------
+    None.
+
+    '''
+    
+    global WORKER_VOLUME_LIST
+    WORKER_VOLUME_LIST = volumeList
+    
+    return
+
+
+
+def trackPhotonsInWorker(photonBatch):
+    '''
+    tracking a batch of optical photons in a worker process with its own random number stream
+
+    Parameters
+    ----------
+    photonBatch : tuple
+                  (list of opticalPhoton objects, track number of the first photon, np.random.SeedSequence of the batch).
+
+    Returns
+    -------
+    list of structured numpy arrays
+        The tracking history of each photon.
+
+    '''
+    
+    sourcePhotons, firstTrackNumber, seedSequence = photonBatch
+    seedRNG(seedSequence)
+    
+    return trackPhotons(sourcePhotons, WORKER_VOLUME_LIST, firstTrackNumber)
+
+
+
+def trackPhotonsParallel(sourcePhotons, volumeList, batchSize = 100, numberOfProcesses = None, seed = None):
+    '''
+    tracking optical photons in batches distributed over a pool of worker processes
+    
+    Note: every batch is tracked with a random number stream spawned from a single seed sequence, so the results
+          are reproducible for a given seed and batch size regardless of the number of processes and the forked
+          workers don't share the inherited generator state.
+    Note: the worker pool is used only with the 'fork' start method (Linux). With 'spawn' (Windows, macOS) every
+          worker re-imports the calling script, e.g. main.py, which would rebuild the geometry and create another
+          pool, so the batches are tracked one after another in the calling process instead with the same random
+          number streams, i.e. the same results.
+
+    Parameters
+    ----------
+    sourcePhotons     : list of opticalPhoton objects
+                        Photons to be tracked.
+    volumeList        : dict of volume objects
+                        All Geometry volume objects.
+    batchSize         : int, optional
+                        Number of photons tracked together in a worker process.
+                        The default is 100.
+    numberOfProcesses : int, optional
+                        Number of worker processes. The default is None, i.e. os.cpu_count().
+    seed              : int, optional
+                        Seed of the batches random number streams. The default is None, i.e. fresh entropy.
+
+    Yields
+    ------
+    opTrackingHistory : structured numpy array
+                        The tracking history of each photon in the order of sourcePhotons.
+
+    '''
+    
+    batchStarts   = range(0, len(sourcePhotons), batchSize)
+    seedSequences = np.random.SeedSequence(seed).spawn(len(batchStarts))
+    photonBatches = ((sourcePhotons[batchStart:batchStart+batchSize], batchStart, seedSequence)
+                     for batchStart, seedSequence in zip(batchStarts, seedSequences))
+    
+    if multiprocessing.get_start_method() != 'fork':
+        initializeWorker(volumeList)
+        for opTrackingHistories in map(trackPhotonsInWorker, photonBatches):
+            yield from opTrackingHistories
+        return
+    
+    with multiprocessing.Pool(numberOfProcesses, initializer=initializeWorker, initargs=(volumeList, )) as pool:
+        for opTrackingHistories in pool.imap(trackPhotonsInWorker, photonBatches):
+            yield from opTrackingHistories
 
 #%% main
 
@@ -19,15 +19,49 @@ import materials
 import surface
 
 
+#= integer dict keys of the cuboid side planes, i.e. encodeNormal() of their axis-aligned normal vectors
+NORMAL_KEYS = {'-x': -16,
+               '+x':  16,
+               '-y':  -4,
+               '+y':   4,
+               '-z':  -1,
+               '+z':   1
+               }
+
+
 
 def resetIPython():
+    if 'IPython' not in sys.modules: return
     from IPython import get_ipython
+    if get_ipython() is None: return
     get_ipython().run_line_magic('reset', '-f')
     #get_ipython().run_line_magic('clear', '')
     #get_ipython().run_line_magic('matplotlib', 'inline')
     return
 
 
+
+def encodeNormal(normal):
+    '''
+    encoding an axis-aligned normal vector as an integer dict key: n_x*16 + n_y*4 + n_z
+    
+    Note: the components of the side planes normal vectors of a cuboid are only -1, 0, or 1, which makes the key
+          unique. Unlike a tuple of floats, the key doesn't depend on the exact float values, e.g. -0.0.
+
+    Parameters
+    ----------
+    normal : (3,) array of floats
+             Axis-aligned normal unit vector.
+
+    Returns
+    -------
+    int
+
+    '''
+    
+    return int(round(normal[0]))*16 + int(round(normal[1]))*4 + int(round(normal[2]))
+
+
 class volume:
     
     def __init__(self, name, material, width, length, center, surfaceTrimeshes = None, touchingVolumes = None):
@@ -77,6 +111,82 @@ class volume:
         self.volumeTrimesh    = trimesh.creation.box(extents=np.array([width, width, length])*1E3, transform=translationMatrix)
         self.surfaceTrimeshes = surfaceTrimeshes
         self.touchingVolumes  = touchingVolumes
+        #  Note: the bounds are rounded once because of the floating point errors in some of the constructed
+        #        volume trimeshes.
+        self.bounds           = np.round(self.volumeTrimesh.bounds, 9)    # um
+        self.setLateralBounds()
+        
+        # == store the volume trimesh triangles as contiguous arrays to intersect light rays with directly
+        self.setTriangleArrays()
+        
+        
+        
+    def __setstate__(self, state):
+        '''
+        restore a pickled volume and update volumes pickled with an older version of the class, i.e. add the triangle
+        arrays and rounded bounds, and re-key the surface trimeshes and touching volumes by the encoded normal vectors instead of tuples
+        '''
+        
+        self.__dict__.update(state)
+        if not hasattr(self, 'trianglesOrigin'): self.setTriangleArrays()
+        if not hasattr(self, 'bounds'): self.bounds = np.round(self.volumeTrimesh.bounds, 9)
+        if not hasattr(self, 'lateralBounds'): self.setLateralBounds()
+        materials.materials.addReflectorLookups(self.material)
+        for sidesAttribute in ('surfaceTrimeshes', 'touchingVolumes'):
+            sides = getattr(self, sidesAttribute)
+            if sides:
+                setattr(self, sidesAttribute, {encodeNormal(key) if isinstance(key, tuple) else key: value for key, value in sides.items()})
+        #= rebuild the surface trimeshes ray accelerators that aren't pickled
+        if self.surfaceTrimeshes:
+            for aSurface in self.surfaceTrimeshes.values():
+                if isinstance(aSurface, surface.surface): aSurface.buildRayAccelerator()
+        
+        
+        
+    def setTriangleArrays(self):
+        '''
+        storing the volume trimesh triangles as structure-of-arrays for the Moller-Trumbore ray intersection
+        
+        Note: the arrays are kept in float64 since the intersection points are rounded to 1E-9 um downstream.
+
+        Returns
+        -------
+        None.
+
+        '''
+        
+        triangles = np.asarray(self.volumeTrimesh.triangles, dtype=np.float64)
+        
+        self.trianglesOrigin = np.ascontiguousarray(triangles[:, 0, :])
+        self.trianglesEdge1  = np.ascontiguousarray(triangles[:, 1, :] - triangles[:, 0, :])
+        self.trianglesEdge2  = np.ascontiguousarray(triangles[:, 2, :] - triangles[:, 0, :])
+        self.trianglesNormal = np.ascontiguousarray(self.volumeTrimesh.face_normals, dtype=np.float64)
+        
+        return
+        
+        
+        
+    def setLateralBounds(self):
+        '''
+        storing the lateral coordinates indices and bounds of each side plane keyed by the encoded normal vector,
+        i.e. {normalKey: (ax1 index, ax2 index, ax1 lower bound, ax1 upper bound, ax2 lower bound, ax2 upper bound)}
+        
+        Note: the bounds are stored as floats to be compared directly with the intersection points coordinates.
+
+        Returns
+        -------
+        None.
+
+        '''
+        
+        self.lateralBounds = {}
+        for side, normalKey in NORMAL_KEYS.items():
+            ax1, ax2 = [i for i in range(3) if i != 'xyz'.index(side[1])]
+            self.lateralBounds[normalKey] = (ax1, ax2,
+                                             float(self.bounds[0, ax1]), float(self.bounds[1, ax1]),
+                                             float(self.bounds[0, ax2]), float(self.bounds[1, ax2]))
+        
+        return
         
         
         
@@ -104,13 +214,7 @@ class volume:
         '''
         
         # == check if information for all surfaces are entered
-        surfacesNormaldict = {'-x': (-1.0, 0.0, 0.0),
-                              '+x':  (1.0, 0.0, 0.0),
-                              '-y': (0.0, -1.0, 0.0),
-                              '+y':  (0.0, 1.0, 0.0),
-                              '-z': (0.0, 0.0, -1.0),
-                              '+z':  (0.0, 0.0, 1.0)
-                              }
+        surfacesNormaldict = NORMAL_KEYS
         for surf in surfacesNormaldict.keys():
             if surf not in list(surfaceTrimeshes.keys()):
                 raise ValueError('A surface is missing from the entered surfaces list...\n'
@@ -120,6 +224,7 @@ class volume:
             # = load surfaces directly if they were previously created and stored
             for surf, normal in surfacesNormaldict.items():
                 surfaceTrimeshes[normal] = pickle.load(open(surfaceTrimeshes[surf]+'.pkl', 'rb'))
+                surfaceTrimeshes[normal].buildRayAccelerator()
             self.surfaceTrimeshes = surfaceTrimeshes
         else:
             # = create new surfaces
@@ -129,6 +234,7 @@ class volume:
                 aSurface.loadPointCloud(pointCloudFileName)
                 aSurface.createTriangularMesh()
                 aSurface.applyDefaultOrientation()
+                aSurface.buildRayAccelerator()
                 surfaceTrimeshes[normal] = aSurface
             self.surfaceTrimeshes = surfaceTrimeshes
         
@@ -156,13 +262,7 @@ class volume:
         '''
         
         # == check if information for all surfaces are entered
-        surfacesNormaldict = {'-x': (-1.0, 0.0, 0.0),
-                              '+x':  (1.0, 0.0, 0.0),
-                              '-y': (0.0, -1.0, 0.0),
-                              '+y':  (0.0, 1.0, 0.0),
-                              '-z': (0.0, 0.0, -1.0),
-                              '+z':  (0.0, 0.0, 1.0)
-                              }
+        surfacesNormaldict = NORMAL_KEYS
         for surf in surfacesNormaldict.keys():
             if surf not in list(touchingVolumes.keys()):
                 raise ValueError('A touching surface is missing from the list...\n'
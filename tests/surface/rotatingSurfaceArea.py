@@ -0,0 +1,65 @@
+try:
+    from IPython import get_ipython
+except ImportError:
+    get_ipython = lambda: None
+if get_ipython() is not None: get_ipython().run_line_magic('reset', '-f')
+#get_ipython().run_line_magic('clear', '')
+#get_ipython().run_line_magic('matplotlib', 'auto')
+
+import sys
+sys.path.append('../../src')
+
+import surface
+
+import numpy as np
+import pickle
+import trimesh
+
+
+#= create a small rough surface facing +z from a grid of points with random heights
+rng       = np.random.default_rng(0)
+ax1, ax2  = np.meshgrid(np.linspace(-50.0, 50.0, 21), np.linspace(-50.0, 50.0, 21))
+points    = np.column_stack((ax1.ravel(), ax2.ravel(), rng.normal(0.0, 0.5, ax1.size)))
+cells     = np.array([i*21+j for i in range(20) for j in range(20)])
+faces     = np.vstack((np.column_stack((cells, cells+1, cells+21)), np.column_stack((cells+1, cells+22, cells+21))))
+
+aSurface             = surface.surface(surfaceFinish='test', normalOrientation='+z')
+aSurface.trimesh     = trimesh.Trimesh(vertices=points, faces=faces, process=False)
+aSurface.faceNormals = aSurface.trimesh.face_normals.copy()
+
+#= test cases, i.e. the surface state before rotating it twice
+testCases = {# surface right after triangulation
+             'case_1': lambda: aSurface,
+             
+             # surface cropped to the triangles within the limits, which passes its face normals to Trimesh
+             'case_2': lambda: (aSurface.cropTriangulatedArea([-40.0, 40.0], [-40.0, 40.0]), aSurface)[1],
+             
+             # surface restored from a pickle, which rebuilds its trimesh from the stored arrays
+             'case_3': lambda: pickle.loads(pickle.dumps(aSurface)),
+            }
+
+
+for key, getSurface in testCases.items():
+    
+    #print('Testing:', key)
+    testSurface      = getSurface()
+    initialVertices  = np.array(testSurface.trimesh.vertices)
+    
+    #= rotate twice around the surface normal axis and compare with a single rotation by the total angle
+    try:
+        testSurface.rotateSurfaceFeatures(30.0)
+        testSurface.rotateSurfaceFeatures(60.0)
+    except ValueError as error:
+        print('\n')
+        print('{} failed testing! ... \n Error: {}'.format(key, error))
+        continue
+    
+    R = trimesh.transformations.rotation_matrix(np.pi/2, [0, 0, 1])[:3, :3]
+    verticesMatch    = np.allclose(testSurface.trimesh.vertices, initialVertices @ R.T, atol=1E-9)
+    normalsMatch     = np.allclose(testSurface.faceNormals, testSurface.trimesh.face_normals, atol=1E-9)\
+                       and np.allclose(testSurface.faceNormals, trimesh.triangles.normals(testSurface.trimesh.triangles)[0], atol=1E-9)
+    
+    #= check if results match the expected corect ones
+    print('\n')
+    if verticesMatch and normalsMatch: print('{} is checked and passed!'.format(key))
+    else: print('{} failed testing! ... \n vertices match: {}, normals match: {}'.format(key, verticesMatch, normalsMatch))
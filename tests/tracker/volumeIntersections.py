@@ -1,5 +1,8 @@
-from IPython import get_ipython
-get_ipython().run_line_magic('reset', '-f')
+try:
+    from IPython import get_ipython
+except ImportError:
+    get_ipython = lambda: None
+if get_ipython() is not None: get_ipython().run_line_magic('reset', '-f')
 #get_ipython().run_line_magic('clear', '')
 #get_ipython().run_line_magic('matplotlib', 'auto')
 
@@ -19,13 +22,29 @@ geometryFileName     = 'wrapped_4dm_geometry_pillar_200mm'
 volumeList           = pickle.load(open(f"../../data/geometries/{geometryFileName}.pkl", 'rb'))
 
 
+def resultsMatch(expectedResults, results):
+    '''
+    checking whether the results match the expected ones to 3 decimal places, i.e. the arrays are compared
+    with np.allclose and the other values for equality; DeepDiff is only used to report the differences of failures
+    '''
+    
+    for name, expected in expectedResults.items():
+        value = results[name]
+        if isinstance(expected, np.ndarray) or isinstance(value, np.ndarray):
+            if not (isinstance(expected, np.ndarray) and isinstance(value, np.ndarray)): return False
+            if expected.shape != value.shape or not np.allclose(expected, value, rtol=0, atol=1E-3): return False
+        elif expected != value: return False
+    
+    return True
+
+
 #### === bare scintillator test cases
 if not reflected:
     testCases = { # photon is inside the pillar and headed towards the outisde environment
                   'case_1': {'position'   : np.array([[0.0, 0.0, 0.0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'pillar',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 1], 0.0]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['pillar'].bounds[1, 1], 0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'environment'
                                             }
@@ -35,27 +54,27 @@ if not reflected:
                   'case_2': {'position'   : np.array([[0.0, 0.0, 0.0]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'pillar',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 2]]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['pillar'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'OG_r'
                                             }
                             },
                   
                   # photon is inside the left OG volume and headed towards the pillar
-                  'case_3': {'position'   : np.array([[0.0, 0.0, volumeList['OG_l'].volumeTrimesh.bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
+                  'case_3': {'position'   : np.array([[0.0, 0.0, volumeList['OG_l'].bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'OG_l',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['OG_l'].volumeTrimesh.bounds[1, 2]]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['OG_l'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'pillar'
                                             }
                             },
                   
                   # photon is at outside environment and headed towards the pillar
-                  'case_4': {'position'   : np.array([[0.0, volumeList['pillar'].volumeTrimesh.bounds[0, 1]-5.0*1E3, 0.0]]),
+                  'case_4': {'position'   : np.array([[0.0, volumeList['pillar'].bounds[0, 1]-5.0*1E3, 0.0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'environment',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['pillar'].volumeTrimesh.bounds[0, 1], 0.0]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['pillar'].bounds[0, 1], 0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'pillar'
                                             }
@@ -63,13 +82,13 @@ if not reflected:
                   
                   # photon is at outside environment and headed towards the PD volume
                   'case_5': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.005*1E3,
-                                                       volumeList['PD_l'].volumeTrimesh.bounds[1, 2]+5.0*1E3]]),
+                                                       volumeList['pillar'].bounds[0, 1]-0.005*1E3,
+                                                       volumeList['PD_l'].bounds[1, 2]+5.0*1E3]]),
                              'momentumDir': np.array([[0.0, 0.0, -1.0]]),
                              'volume'     : 'environment',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.005*1E3,
-                                                                                      volumeList['PD_l'].volumeTrimesh.bounds[1, 2]]]),
+                                                                                      volumeList['pillar'].bounds[0, 1]-0.005*1E3,
+                                                                                      volumeList['PD_l'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, 1.0]]),
                                              'nextVolume'                : 'PD_l'
                                             }
@@ -77,12 +96,12 @@ if not reflected:
                   
                   # photon is slightly below the pillar surface trimesh and reflecting back
                   'case_6': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
+                                                       volumeList['pillar'].bounds[0, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
                                                        0.0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'pillar',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[1, 1],
+                                                                                      volumeList['pillar'].bounds[1, 1],
                                                                                       0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'environment'
@@ -91,7 +110,7 @@ if not reflected:
                   
                   # photon is slightly above the pillar surface trimesh and transmitting to outside environment
                   'case_7': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]+0.005*volumeList['pillar'].volumeTrimesh.extents[1],
+                                                       volumeList['pillar'].bounds[0, 1]+0.005*volumeList['pillar'].volumeTrimesh.extents[1],
                                                        0.0]]),
                              'momentumDir': np.array([[0.0, -1.0, 0.0]]),
                              'volume'     : 'environment',
@@ -102,32 +121,32 @@ if not reflected:
                             },
                   
                   # photon is slightly above the pillar surface trimesh and transmitting to OG volume
-                  'case_8': {'position'   : np.array([[0.0, 0.0, volumeList['OG_r'].volumeTrimesh.bounds[0, 2]-0.005*volumeList['pillar'].volumeTrimesh.extents[2] ]]),
+                  'case_8': {'position'   : np.array([[0.0, 0.0, volumeList['OG_r'].bounds[0, 2]-0.005*volumeList['pillar'].volumeTrimesh.extents[2] ]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'OG_r',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['OG_r'].volumeTrimesh.bounds[1, 2]]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['OG_r'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'PD_r'
                                             }
                             },
                   
                   # photon is slightly below the pillar surface trimesh and transmitting to OG volume
-                  'case_9': {'position'   : np.array([[0.0, 0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 2]+0.005*volumeList['OG_r'].volumeTrimesh.extents[2] ]]),
+                  'case_9': {'position'   : np.array([[0.0, 0.0, volumeList['pillar'].bounds[1, 2]+0.005*volumeList['OG_r'].volumeTrimesh.extents[2] ]]),
                              'momentumDir': np.array([[0.0, 0.0, -1.0]]),
                              'volume'     : 'pillar',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['pillar'].volumeTrimesh.bounds[0, 2]]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['pillar'].bounds[0, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, 1.0]]),
                                              'nextVolume'                : 'OG_l'
                                             }
                             },
                   
                   # photon is transmitted to outside but slightly below the pillar surface trimesh and headed towards OG volume
-                  'case_10': {'position'  : np.array([[0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1], 0.0]]),
+                  'case_10': {'position'  : np.array([[0.0, volumeList['pillar'].bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1], 0.0]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'environment',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
-                                                                                      volumeList['OG_r'].volumeTrimesh.bounds[0, 2]]]),
+                                                                                      volumeList['pillar'].bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
+                                                                                      volumeList['OG_r'].bounds[0, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'OG_r'
                                             }
@@ -140,7 +159,7 @@ else:
                   'case_1': {'position'   : np.array([[0.0, 0.0, 0.0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'pillar',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 1], 0.0]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['pillar'].bounds[1, 1], 0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'reflector'
                                             }
@@ -150,17 +169,17 @@ else:
                   'case_2': {'position'   : np.array([[0.0, 0.0, 0.0]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'pillar',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 2]]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['pillar'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'OG_r'
                                             }
                             },
                   
                   # photon is inside the left OG volume and headed towards the pillar
-                  'case_3': {'position'   : np.array([[0.0, 0.0, volumeList['OG_l'].volumeTrimesh.bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
+                  'case_3': {'position'   : np.array([[0.0, 0.0, volumeList['OG_l'].bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'OG_l',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['OG_l'].volumeTrimesh.bounds[1, 2]]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, 0.0, volumeList['OG_l'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'pillar'
                                             }
@@ -168,13 +187,13 @@ else:
                   
                   # photon is at the airgap on the right OG boundary and headed towards the reflector
                   'case_4': {'position'   : np.array([[0.0,
-                                                       volumeList['OG_l'].volumeTrimesh.bounds[0, 1],
-                                                       volumeList['OG_l'].volumeTrimesh.bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
+                                                       volumeList['OG_l'].bounds[0, 1],
+                                                       volumeList['OG_l'].bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
                              'momentumDir': np.array([[0.0, -1.0, 0.0]]),
                              'volume'     : 'reflector',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['reflector'].volumeTrimesh.bounds[0, 1],
-                                                                                      volumeList['OG_l'].volumeTrimesh.bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
+                                                                                      volumeList['reflector'].bounds[0, 1],
+                                                                                      volumeList['OG_l'].bounds[0, 2]+0.5*volumeList['OG_l'].volumeTrimesh.extents[2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 1.0, 0.0]]),
                                              'nextVolume'                : 'reflector'
                                             }
@@ -182,12 +201,12 @@ else:
                   
                   # photon is slightly below the pillar surface trimesh and reflecting back
                   'case_5': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
+                                                       volumeList['pillar'].bounds[0, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
                                                        0.0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'pillar',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[1, 1],
+                                                                                      volumeList['pillar'].bounds[1, 1],
                                                                                       0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'reflector'
@@ -196,12 +215,12 @@ else:
                   
                   # photon is slightly above the pillar surface trimesh and transmitting to the air gap
                   'case_6': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]+0.005*volumeList['pillar'].volumeTrimesh.extents[1],
+                                                       volumeList['pillar'].bounds[0, 1]+0.005*volumeList['pillar'].volumeTrimesh.extents[1],
                                                        0.0]]),
                              'momentumDir': np.array([[0.0, -1.0, 0.0]]),
                              'volume'     : 'reflector',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['reflector'].volumeTrimesh.bounds[0, 1],
+                                                                                      volumeList['reflector'].bounds[0, 1],
                                                                                       0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 1.0, 0.0]]),
                                              'nextVolume'                : 'reflector'
@@ -209,12 +228,12 @@ else:
                             },
                   
                   # photon is transmitted to airgap but slightly below the pillar surface trimesh and headed towards OG volume
-                  'case_7': {'position'  : np.array([[0.0, volumeList['pillar'].volumeTrimesh.bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1], 0.0]]),
+                  'case_7': {'position'  : np.array([[0.0, volumeList['pillar'].bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1], 0.0]]),
                              'momentumDir': np.array([[0.0, 0.0, 1.0]]),
                              'volume'     : 'reflector',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
-                                                                                      volumeList['OG_r'].volumeTrimesh.bounds[0, 2]]]),
+                                                                                      volumeList['pillar'].bounds[1, 1]-0.005*volumeList['pillar'].volumeTrimesh.extents[1],
+                                                                                      volumeList['OG_r'].bounds[0, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, -1.0]]),
                                              'nextVolume'                : 'OG_r'
                                             }
@@ -222,12 +241,12 @@ else:
                   
                   # photon is at the reflector and headed back to the pillar
                   'case_8': {'position'   : np.array([[0.0,
-                                                       volumeList['reflector'].volumeTrimesh.bounds[0, 1],
+                                                       volumeList['reflector'].bounds[0, 1],
                                                        0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'reflector',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[0, 1],
+                                                                                      volumeList['pillar'].bounds[0, 1],
                                                                                       0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'pillar'
@@ -235,10 +254,10 @@ else:
                             },
                   
                   # photon is at outside environment and headed towards the reflector
-                  'case_9': {'position'   : np.array([[0.0, volumeList['reflector'].volumeTrimesh.bounds[0, 1]-5.0*1E3, 0.0]]),
+                  'case_9': {'position'   : np.array([[0.0, volumeList['reflector'].bounds[0, 1]-5.0*1E3, 0.0]]),
                              'momentumDir': np.array([[0.0, 1.0, 0.0]]),
                              'volume'     : 'environment',
-                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['reflector'].volumeTrimesh.bounds[0, 1], 0.0]]),
+                             'results'    : {'volumeIntersectPoint'      : np.array([[0.0, volumeList['reflector'].bounds[0, 1], 0.0]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, -1.0, 0.0]]),
                                              'nextVolume'                : 'reflector'
                                             }
@@ -246,13 +265,13 @@ else:
                   
                   # photon is at the airgap and headed towards the PD volume
                   'case_10': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.000005*1E3,
-                                                       volumeList['PD_l'].volumeTrimesh.bounds[1, 2]+5.0*1E3]]),
+                                                       volumeList['pillar'].bounds[0, 1]-0.000005*1E3,
+                                                       volumeList['PD_l'].bounds[1, 2]+5.0*1E3]]),
                              'momentumDir': np.array([[0.0, 0.0, -1.0]]),
                              'volume'     : 'reflector',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.000005*1E3,
-                                                                                      volumeList['PD_l'].volumeTrimesh.bounds[1, 2]]]),
+                                                                                      volumeList['pillar'].bounds[0, 1]-0.000005*1E3,
+                                                                                      volumeList['PD_l'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, 1.0]]),
                                              'nextVolume'                : 'PD_l'
                                             }
@@ -260,13 +279,13 @@ else:
                   
                   # photon is at outside environment and headed towards the PD volume
                   'case_11': {'position'   : np.array([[0.0,
-                                                       volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.005*1E3,
-                                                       volumeList['PD_l'].volumeTrimesh.bounds[1, 2]+5.0*1E3]]),
+                                                       volumeList['pillar'].bounds[0, 1]-0.005*1E3,
+                                                       volumeList['PD_l'].bounds[1, 2]+5.0*1E3]]),
                              'momentumDir': np.array([[0.0, 0.0, -1.0]]),
                              'volume'     : 'environment',
                              'results'    : {'volumeIntersectPoint'      : np.array([[0.0,
-                                                                                      volumeList['pillar'].volumeTrimesh.bounds[0, 1]-0.005*1E3,
-                                                                                      volumeList['PD_l'].volumeTrimesh.bounds[1, 2]]]),
+                                                                                      volumeList['pillar'].bounds[0, 1]-0.005*1E3,
+                                                                                      volumeList['PD_l'].bounds[1, 2]]]),
                                              'volumeIntersectPlaneNormal': np.array([[0.0, 0.0, 1.0]]),
                                              'nextVolume'                : 'PD_l'
                                             }
@@ -288,16 +307,37 @@ else:
 
 
              
-for key, testCase in testCases.items():
-    
-    #print('Testing:', key)
-    results = {}
+#= group the test cases by the photons' associated volume to intersect each group in a single batched call as done
+#  by tracker.trackPhotons()
+caseGroups = {}
+for key, testCase in testCases.items(): caseGroups.setdefault(testCase['volume'], []).append(key)
+
+for opVolume, keys in caseGroups.items():
     
-    results['volumeIntersectPoint'], results['volumeIntersectPlaneNormal'], results['nextVolume'] =\
-        tracker.getVolumeTrimeshIntersection(volumeList, testCase['position'], testCase['momentumDir'], testCase['volume'])
+    volumeIntersectPoints, volumeIntersectPlaneNormals, nextVolumes =\
+        tracker.getVolumeTrimeshIntersectionBatch(volumeList,
+                                                  np.vstack([testCases[key]['position'] for key in keys]),
+                                                  np.vstack([testCases[key]['momentumDir'] for key in keys]),
+                                                  opVolume)
     
-    #= check if results match the expected corect ones
-    diff = DeepDiff(testCase['results'], results, significant_digits=3)
-    print('\n')
-    if len(diff) == 0: print('{} is checked and passed!'.format(key))
-    else: print('{} failed testing! ... \n Differences are: {}'.format(key, diff))
\ No newline at end of file
+    for c, key in enumerate(keys):
+        
+        #print('Testing:', key)
+        #= photons without intersections are returned with NaN rows and a None next volume
+        results = {'volumeIntersectPoint'      : volumeIntersectPoints[c:c+1] if nextVolumes[c] is not None else None,
+                   'volumeIntersectPlaneNormal': volumeIntersectPlaneNormals[c:c+1] if nextVolumes[c] is not None else None,
+                   'nextVolume'                : nextVolumes[c]
+                  }
+        
+        #= intersect the same photon alone as done by tracker.trackPhoton()
+        singleResults = {}
+        singleResults['volumeIntersectPoint'], singleResults['volumeIntersectPlaneNormal'], singleResults['nextVolume'] =\
+            tracker.getVolumeTrimeshIntersection(volumeList, testCases[key]['position'], testCases[key]['momentumDir'], opVolume)
+        
+        #= check if both results match the expected corect ones and each other
+        print('\n')
+        for tag, caseResults in (('single', singleResults), ('batch', results)):
+            if resultsMatch(testCases[key]['results'], caseResults): print('{} ({}) is checked and passed!'.format(key, tag))
+            else: print('{} ({}) failed testing! ... \n Differences are: {}'.format(key, tag, DeepDiff(testCases[key]['results'], caseResults, significant_digits=3)))
+        if not resultsMatch(singleResults, results):
+            print('{} single and batch results differ! ... \n Differences are: {}'.format(key, DeepDiff(singleResults, results, significant_digits=3)))